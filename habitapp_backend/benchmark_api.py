@@ -0,0 +1,319 @@
+"""
+Benchmark reproducible de la API principal sobre una base local con datos sembrados.
+
+Siembra usuarios, perfiles y hábitos con una semilla fija (solo en bases locales,
+nunca en Neon), inicia sesión con cada usuario y lanza una mezcla configurable
+de operaciones desde varios hilos:
+
+    login     POST  /api/auth/login/
+    habitos   GET   /api/habitos/
+    toggle    PATCH /api/habitos/<id>/   (completado <-> pendiente)
+    ranking   GET   /api/ranking/
+    me        GET   /api/user/me/
+    prolog    GET   /api/prolog-demo/?action=nivel_usuario
+
+Reporta p50/p95/p99 y peticiones/s por operación y guarda el resultado en JSON
+(con el commit actual) para comparar entre commits:
+
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python manage.py setup_local_db
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python benchmark_api.py \\
+        --concurrency 8 --duration 30 --mix habitos=5,toggle=2,ranking=2,me=3,prolog=1,login=1
+    python benchmark_api.py --compare bench_results/antes.json bench_results/despues.json
+
+Por defecto las peticiones pasan por el cliente de pruebas de DRF en este mismo
+proceso. Con --url se mide un servidor real (p. ej. gunicorn) que use la misma
+base local.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.db import connection, connections, transaction
+from rest_framework.test import APIClient
+from core.bulk import load_rows
+from core.hashing import make_password
+from core.dias import dias_to_mask
+from core.models import Habito, Perfil, Preferencia, Usuario, UsuarioHabito
+
+PASSWORD = 'BenchPassword123'
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+CATEGORIAS = ['Salud', 'Estudio', 'Mindfulness', 'Ejercicio', 'Productividad']
+DIAS = 'Lun,Mar,Mie,Jue,Vie'
+DEFAULT_MIX = 'habitos=5,toggle=2,ranking=2,me=3,prolog=1,login=1'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+
+
+def seed(num_users, habits_per_user, rng):
+    """Creates the bench_api_* users once; later runs reuse them."""
+    if connection.vendor != 'sqlite' and connection.settings_dict.get('HOST') not in LOCAL_HOSTS:
+        raise SystemExit('Refusing to seed non-local database host {}'.format(connection.settings_dict.get('HOST')))
+
+    usernames = ['bench_api_{}'.format(i) for i in range(num_users)]
+    existing = set(Usuario.objects.filter(username__in=usernames).values_list('username', flat=True))
+    missing = [name for name in usernames if name not in existing]
+    if missing:
+        encoded = make_password(PASSWORD)
+        today = date.today()
+        with transaction.atomic():
+            Usuario.objects.bulk_create([
+                Usuario(username=name, email='{}@bench.local'.format(name), password=encoded) for name in missing
+            ])
+            users = list(Usuario.objects.filter(username__in=missing))
+            Perfil.objects.bulk_create([
+                Perfil(usuario=u, puntos_totales=int(rng.paretovariate(1.5) * 50), racha_actual=rng.randint(0, 30))
+                for u in users
+            ])
+            Preferencia.objects.bulk_create([Preferencia(usuario=u) for u in users])
+            habitos = []
+            for u in users:
+                # Heavy-tailed activity: a few users own most habits
+                count = min(habits_per_user * 5, max(1, int(rng.paretovariate(1.2) * habits_per_user / 3)))
+                for _ in range(count):
+                    habitos.append(Habito(
+                        usuario=u, nombre='Hábito {}'.format(rng.randint(1, 500)), puntos=rng.choice([10, 15, 20, 30, 50]),
+                        categoria=rng.choice(CATEGORIAS), dias=DIAS, dias_mask=dias_to_mask(DIAS),
+                        fecha=today - timedelta(days=rng.randint(0, 60)),
+                        estado='completado' if rng.random() < 0.6 else 'pendiente',
+                    ))
+            Habito.objects.bulk_create(habitos, batch_size=1000)
+    # The views create the usuario_habito link with every habit; seed it too (also for
+    # users seeded before it was). Its fake pk rules out bulk_create.
+    links = list(
+        Habito.objects.filter(usuario__username__in=usernames)
+        .exclude(id_habito__in=UsuarioHabito.objects.values('habito'))
+        .values_list('usuario_id', 'id_habito')
+    )
+    if links:
+        with transaction.atomic(), connection.cursor() as cursor:
+            load_rows(connection, cursor, 'usuario_habito', ('id_usuario', 'id_habito'), links)
+    return usernames
+
+
+class InProcessClient:
+    def __init__(self):
+        self.client = APIClient()
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': 'Bearer ' + token} if token else {}
+        response = getattr(self.client, method.lower())(path, data, format='json', **headers)
+        return response.status_code, getattr(response, 'data', None)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, data=None, token=None):
+        body = json.dumps(data).encode() if data is not None and method != 'GET' else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if token:
+            request.add_header('Authorization', 'Bearer ' + token)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                payload = response.read()
+                return response.status, json.loads(payload) if payload else None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+class Session:
+    """One logged-in user with its habits and their known state."""
+
+    def __init__(self, client, username):
+        status, data = client.request('POST', '/api/auth/login/', {'username': username, 'password': PASSWORD})
+        if status != 200:
+            raise SystemExit('Login failed for {}: {}'.format(username, status))
+        self.username = username
+        self.token = data['access']
+        status, habitos = client.request('GET', '/api/habitos/', token=self.token)
+        self.habitos = {h['id_habito']: h['estado'] for h in habitos or []}
+
+
+def operations(client, session, rng):
+    def login():
+        return client.request('POST', '/api/auth/login/', {'username': session.username, 'password': PASSWORD})[0]
+
+    def habitos():
+        return client.request('GET', '/api/habitos/', token=session.token)[0]
+
+    def toggle():
+        if not session.habitos:
+            return habitos()
+        id_habito = rng.choice(list(session.habitos))
+        estado = 'pendiente' if session.habitos[id_habito] == 'completado' else 'completado'
+        status = client.request('PATCH', '/api/habitos/{}/'.format(id_habito), {'estado': estado}, token=session.token)[0]
+        if status == 200:
+            session.habitos[id_habito] = estado
+        return status
+
+    def ranking():
+        return client.request('GET', '/api/ranking/', token=session.token)[0]
+
+    def me():
+        return client.request('GET', '/api/user/me/', token=session.token)[0]
+
+    def prolog():
+        return client.request('GET', '/api/prolog-demo/?action=nivel_usuario&puntos={}'.format(rng.randint(0, 2000)))[0]
+
+    return {'login': login, 'habitos': habitos, 'toggle': toggle, 'ranking': ranking, 'me': me, 'prolog': prolog}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def summarize(latencies, statuses, elapsed):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': sum(1 for s in statuses if s >= 400),
+        'rps': round(len(values) / elapsed, 2),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.mean(values) * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    usernames = seed(args.users, args.habits_per_user, rng)
+    make_client = (lambda: HttpClient(args.url)) if args.url else InProcessClient
+
+    setup_client = make_client()
+    sessions = [Session(setup_client, name) for name in usernames[:args.concurrency]]
+
+    samples = {name: ([], []) for name in mix}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(index):
+        worker_rng = random.Random(args.seed + index)
+        ops = operations(make_client(), sessions[index % len(sessions)], worker_rng)
+        names, weights = list(mix), list(mix.values())
+        local = {name: ([], []) for name in mix}
+        while time.perf_counter() < deadline:
+            name = worker_rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            status = ops[name]()
+            local[name][0].append(time.perf_counter() - start)
+            local[name][1].append(status)
+        with lock:
+            for name, (latencies, statuses) in local.items():
+                samples[name][0].extend(latencies)
+                samples[name][1].extend(statuses)
+        connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    results = {name: summarize(lat, st, elapsed) for name, (lat, st) in samples.items() if lat}
+    all_latencies = [l for lat, _ in samples.values() for l in lat]
+    all_statuses = [s for _, st in samples.values() for s in st]
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'database': connection.vendor,
+        'target': args.url or 'in-process',
+        'concurrency': args.concurrency,
+        'duration_s': round(elapsed, 2),
+        'mix': mix,
+        'users': args.users,
+        'seed': args.seed,
+        'total': summarize(all_latencies, all_statuses, elapsed) if all_latencies else None,
+        'operations': results,
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(RESULTS_DIR, '{}-{}.json'.format(
+        time.strftime('%Y%m%d-%H%M%S'), report['commit'] or 'nogit'
+    ))
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Resultados guardados en {}'.format(output))
+
+
+def print_report(report):
+    print('=' * 78)
+    print('Commit {}  base {}  destino {}  hilos {}  duración {} s'.format(
+        report['commit'], report['database'], report['target'], report['concurrency'], report['duration_s']))
+    print('{:<10} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9}'.format('operación', 'peticiones', 'errores', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    rows = list(report['operations'].items()) + ([('TOTAL', report['total'])] if report['total'] else [])
+    for name, r in rows:
+        print('{:<10} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9}'.format(
+            name, r['requests'], r['errors'], r['rps'], r['p50_ms'], r['p95_ms'], r['p99_ms']))
+    print('=' * 78)
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print('{} ({}) -> {} ({})'.format(before_path, before['commit'], after_path, after['commit']))
+    print('{:<10} {:>18} {:>18} {:>18}'.format('operación', 'req/s', 'p95 ms', 'p99 ms'))
+    for name in sorted(set(before['operations']) | set(after['operations'])):
+        b, a = before['operations'].get(name), after['operations'].get(name)
+        if not b or not a:
+            continue
+        cells = []
+        for key in ('rps', 'p95_ms', 'p99_ms'):
+            change = (a[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+            cells.append('{} -> {} ({:+.0f}%)'.format(b[key], a[key], change))
+        print('{:<10} {:>18} {:>18} {:>18}'.format(name, *cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Operation weights, e.g. ' + DEFAULT_MIX)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--habits-per-user', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--url', help='Base URL of a running server (default: in-process test client)')
+    parser.add_argument('--output', help='JSON results file (default: bench_results/<time>-<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files and exit')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+    sys.exit(0)
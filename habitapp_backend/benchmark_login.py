@@ -0,0 +1,88 @@
+"""
+Benchmark de throughput de login bajo carga concurrente.
+
+Crea usuarios de prueba en una base local y lanza logins desde varios hilos a
+través del cliente de pruebas de DRF, reportando logins/s, latencias y las
+métricas de la cola de hashing (core/hashing.py).
+
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python manage.py setup_local_db
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python benchmark_login.py --threads 8 --logins 200
+
+Compara con PASSWORD_HASHING_WORKERS=0 para medir el hashing inline.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.conf import settings
+from rest_framework.test import APIClient
+from core.hashing import hashing_pool, make_password
+from core.models import Usuario
+
+PASSWORD = 'BenchPassword123'
+
+
+def seed(num_users):
+    encoded = make_password(PASSWORD)
+    usernames = ['bench_login_{}'.format(i) for i in range(num_users)]
+    existing = set(Usuario.objects.filter(username__in=usernames).values_list('username', flat=True))
+    Usuario.objects.bulk_create([
+        Usuario(username=name, email='{}@bench.local'.format(name), password=encoded)
+        for name in usernames if name not in existing
+    ])
+    return usernames
+
+
+def login(username):
+    client = APIClient()
+    start = time.perf_counter()
+    response = client.post('/api/auth/login/', {'username': username, 'password': PASSWORD}, format='json')
+    return response.status_code, time.perf_counter() - start
+
+
+def run(threads, logins, num_users):
+    usernames = seed(num_users)
+    targets = [usernames[i % len(usernames)] for i in range(logins)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(login, targets))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    codes = {}
+    for code, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    stats = hashing_pool.stats
+    print('=' * 60)
+    print('Workers de hashing: {}  Hilos: {}  Logins: {}'.format(settings.PASSWORD_HASHING_WORKERS, threads, logins))
+    print('Respuestas: {}'.format(codes))
+    print('Throughput: {:.1f} logins/s'.format(logins / elapsed))
+    print('Latencia p50: {:.1f} ms  p95: {:.1f} ms  p99: {:.1f} ms  media: {:.1f} ms'.format(
+        pct(0.50), pct(0.95), pct(0.99), statistics.mean(latencies) * 1000))
+    if stats['submitted']:
+        print('Cola de hashing: media {:.1f} ms  max {:.1f} ms  rechazados {}'.format(
+            stats['queue_time_total'] / stats['submitted'] * 1000, stats['queue_time_max'] * 1000, stats['rejected']))
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+    run(args.threads, args.logins, args.users)
+    sys.exit(0)
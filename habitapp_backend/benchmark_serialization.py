@@ -0,0 +1,119 @@
+"""
+Benchmark de serialización de respuestas grandes: lista de hábitos y ranking.
+
+Compara, sobre respuestas de 10k filas (por defecto), el camino anterior
+(ModelSerializer + JSONRenderer de DRF) con el actual (tuplas de values_list()
+vía serializer_rows + FastJSONRenderer con orjson), y el parseo de ese mismo
+cuerpo con JSONParser frente a FastJSONParser. Comprueba además que ambos caminos
+producen el mismo contenido JSON.
+
+Solo en bases locales, nunca en Neon (el ranking usa los perfiles existentes y
+completa los que falten con generate_data):
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python manage.py setup_local_db
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python benchmark_serialization.py --rows 10000
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import time
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.dias import dias_to_mask
+from core.models import Habito, Perfil, Usuario
+from core.renderers import FastJSONParser, FastJSONRenderer
+from core.serializers import HABITO_COLUMNS, RANKING_COLUMNS, HabitoSerializer, RankingSerializer, serializer_rows
+
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+USERNAME = 'bench_serialization'
+DIAS = 'Lun,Mar,Mie,Jue,Vie'
+
+
+def seed(rows):
+    if connection.vendor != 'sqlite' and connection.settings_dict.get('HOST') not in LOCAL_HOSTS:
+        raise SystemExit('Refusing to seed non-local database host {}'.format(connection.settings_dict.get('HOST')))
+
+    user, _ = Usuario.objects.get_or_create(
+        username=USERNAME, defaults={'email': USERNAME + '@bench.local', 'password': 'x'}
+    )
+    missing = rows - Habito.objects.filter(usuario=user).count()
+    if missing > 0:
+        today = date.today()
+        with transaction.atomic():
+            Habito.objects.bulk_create([
+                Habito(
+                    usuario=user, nombre='Hábito {}'.format(i), descripcion='Descripción del hábito {}'.format(i),
+                    puntos=10 + i % 40, fecha=today - timedelta(days=i % 90), categoria='Salud', dias=DIAS,
+                    dias_mask=dias_to_mask(DIAS), estado='completado' if i % 3 else 'pendiente',
+                )
+                for i in range(missing)
+            ], batch_size=2000)
+    missing = rows - Perfil.objects.count()
+    if missing > 0:
+        call_command('generate_data', users=missing, seed=1, max_habits=3, prefix='bench_ser_', verbosity=0)
+    return user
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def compare(label, queryset, serializer_class, columns, repeat):
+    old_renderer, new_renderer = JSONRenderer(), FastJSONRenderer()
+    old_parser, new_parser = JSONParser(), FastJSONParser()
+    # Fetch once outside the timings, so both paths start from a warm database
+    list(queryset)
+
+    old_build, old_data = timed(lambda: serializer_class(queryset.all(), many=True).data, repeat)
+    new_build, new_data = timed(lambda: serializer_rows(queryset.all(), serializer_class, columns), repeat)
+    old_render, old_body = timed(lambda: old_renderer.render(old_data), repeat)
+    new_render, new_body = timed(lambda: new_renderer.render(new_data), repeat)
+    old_parse, _ = timed(lambda: old_parser.parse(io.BytesIO(old_body)), repeat)
+    new_parse, _ = timed(lambda: new_parser.parse(io.BytesIO(new_body)), repeat)
+
+    same = json.loads(old_body) == json.loads(new_body)
+    print('{}: {} filas, {} KB, JSON idéntico: {}'.format(label, len(new_data), len(new_body) // 1024, 'sí' if same else 'NO'))
+    print('  {:<28} {:>12} {:>12} {:>9}'.format('', 'DRF (ms)', 'rápido (ms)', 'mejora'))
+    for name, old, new in (
+        ('consulta + serialización', old_build, new_build),
+        ('render JSON', old_render, new_render),
+        ('total respuesta', old_build + old_render, new_build + new_render),
+        ('parseo JSON', old_parse, new_parse),
+    ):
+        print('  {:<28} {:>12.2f} {:>12.2f} {:>8.1f}x'.format(name, old, new, old / new if new else float('inf')))
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    user = seed(args.rows)
+    habitos = Habito.objects.filter(usuario=user)[:args.rows]
+    # Tie-break so both paths list tied users in the same order
+    ranking = Perfil.objects.select_related('usuario').order_by('-puntos_totales', 'usuario_id')[:args.rows]
+    ok = compare('Lista de hábitos', habitos, HabitoSerializer, HABITO_COLUMNS, args.repeat)
+    ok = compare('Ranking', ranking, RankingSerializer, RANKING_COLUMNS, args.repeat) and ok
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import threading
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .conditions import as_threshold
+from .models import Logro, Perfil
+
+COUNTER_FIELDS = Perfil.COUNTER_FIELDS
+
+AWARD_SQL_POSTGRES = """
+WITH nuevos AS (
+    INSERT INTO usuario_logro (id_usuario, id_logro, fecha_obtencion)
+    SELECT %s, id_logro, now() FROM unnest(%s::integer[]) AS t(id_logro)
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+UPDATE perfiles SET num_logros_obtenidos = num_logros_obtenidos + (SELECT count(*) FROM nuevos)
+WHERE id_usuario = %s
+RETURNING (SELECT count(*) FROM nuevos)
+"""
+
+
+class AchievementEngine:
+    """
+    Keeps the threshold achievements (Logro.condicion of the form `field >= N`, see
+    core/conditions.py) as one sorted array per profile counter.
+    When counters move from `before` to `after`, the newly crossed achievements
+    are the slice between bisect(before) and bisect(after), so the work per
+    event is proportional to the unlocks, not to the number of achievements.
+    Compound or history-based conditions are awarded by `award_achievements`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thresholds = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        by_field = {field: [] for field in COUNTER_FIELDS}
+        for id_logro, condicion in Logro.objects.values_list('id_logro', 'condicion'):
+            parsed = as_threshold(condicion)
+            if parsed and parsed[0] in by_field:
+                field, threshold = parsed
+                by_field[field].append((threshold, id_logro))
+        thresholds = {}
+        for field, pairs in by_field.items():
+            pairs.sort()
+            thresholds[field] = ([t for t, _ in pairs], [i for _, i in pairs])
+        self._thresholds = thresholds
+        self._loaded_at = time.monotonic()
+
+    def thresholds(self):
+        if self._thresholds is None or time.monotonic() - self._loaded_at > settings.ACHIEVEMENTS_RELOAD:
+            with self._lock:
+                if self._thresholds is None or time.monotonic() - self._loaded_at > settings.ACHIEVEMENTS_RELOAD:
+                    self._load()
+        return self._thresholds
+
+    def invalidate(self):
+        self._thresholds = None
+
+    def crossed(self, before, after):
+        """Ids of achievements whose threshold lies in (before, after] for any counter."""
+        ids = []
+        for field, (values, logro_ids) in self.thresholds().items():
+            old, new = before.get(field, 0) or 0, after.get(field, 0) or 0
+            if new > old:
+                ids.extend(logro_ids[bisect_right(values, old):bisect_right(values, new)])
+        return ids
+
+    def award(self, id_usuario, logro_ids):
+        """
+        Inserts the UsuarioLogro rows and bumps Perfil.num_logros_obtenidos by the
+        number actually inserted. Returns that number.
+        """
+        if not logro_ids:
+            return 0
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(AWARD_SQL_POSTGRES, [id_usuario, list(logro_ids), id_usuario])
+                row = cursor.fetchone()
+            return row[0] if row else 0
+
+        # Portable fallback (SQLite stand-ins): same effect in one transaction
+        placeholders = ', '.join(['%s'] * len(logro_ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO usuario_logro (id_usuario, id_logro, fecha_obtencion) '
+                'SELECT %s, id_logro, CURRENT_TIMESTAMP FROM logros '
+                'WHERE id_logro IN ({}) AND id_logro NOT IN ('
+                '    SELECT id_logro FROM usuario_logro WHERE id_usuario = %s'
+                ')'.format(placeholders),
+                [id_usuario, *logro_ids, id_usuario],
+            )
+            inserted = cursor.rowcount
+            if inserted:
+                cursor.execute(
+                    'UPDATE perfiles SET num_logros_obtenidos = num_logros_obtenidos + %s WHERE id_usuario = %s',
+                    [inserted, id_usuario],
+                )
+        return inserted
+
+    def on_counters_changed(self, id_usuario, before, after):
+        return self.award(id_usuario, self.crossed(before, after))
+
+
+achievement_engine = AchievementEngine()
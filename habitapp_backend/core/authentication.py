@@ -0,0 +1,52 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_usuario
+from .revocation import revocation_list
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight request.user built from the token claims alone.
+    Views that only need id_usuario never touch the database; views that need the
+    full row use `request.user.usuario`, which goes through the user cache.
+    """
+
+    @cached_property
+    def id_usuario(self):
+        return int(self.id)
+
+    @cached_property
+    def pk(self):
+        return self.id_usuario
+
+    @cached_property
+    def usuario(self):
+        user = get_usuario(self.id_usuario)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user
+
+    def __str__(self):
+        return 'ClaimsUser {}'.format(self.id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not SELECT the user on every request.
+    Revoked tokens are rejected through the in-process revocation list.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(validated_token):
+            raise InvalidToken('Token has been revoked')
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        return ClaimsUser(validated_token)
@@ -0,0 +1,175 @@
+"""
+Habit name suggestions for /api/habitos/autocomplete/.
+
+Names come from nombres_habito (rebuilt by `build_autocomplete`), matched
+accent-insensitively at the start of any word and ranked by popularity.
+Databases other than Postgres (the SQLite stand-ins) use an in-process trie
+with the best suggestions precomputed on every node.
+
+On Postgres every query has to be served by an index:
+- Below TRIGRAM_MIN_LENGTH characters only the start of the name is matched
+  (`LIKE 'q%'`), a range scan on the text_pattern_ops index. A `LIKE '% q%'`
+  for one or two letters has no selective trigram, so it cannot use either
+  index and reads every row to sort the matches by popularity.
+- From TRIGRAM_MIN_LENGTH on, the start of any word is matched and both LIKEs
+  are answered by the gin_trgm_ops index, followed by a similarity pass for
+  typos.
+Check the plans with `benchmark_autocomplete.py --db --seed --explain` on a local
+Postgres before changing either query.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import Habito, NombreHabito
+from .recommender import load_catalog
+from .text import fold
+
+# Shortest query whose trigrams narrow the gin index usefully
+TRIGRAM_MIN_LENGTH = 3
+
+PREFIX_SQL = """
+SELECT nombre, popularidad, en_catalogo FROM nombres_habito
+WHERE nombre_normalizado LIKE %s
+ORDER BY popularidad DESC, en_catalogo DESC, nombre_normalizado
+LIMIT %s
+"""
+
+SEARCH_SQL = """
+SELECT nombre, popularidad, en_catalogo FROM nombres_habito
+WHERE nombre_normalizado LIKE %s OR nombre_normalizado LIKE %s
+ORDER BY popularidad DESC, en_catalogo DESC, nombre_normalizado
+LIMIT %s
+"""
+
+# `%%` is pg_trgm's similarity operator, escaped for the DB-API
+FUZZY_SQL = """
+SELECT nombre, popularidad, en_catalogo FROM nombres_habito
+WHERE nombre_normalizado %% %s
+ORDER BY similarity(nombre_normalizado, %s) DESC, popularidad DESC
+LIMIT %s
+"""
+
+
+def collect_names():
+    """
+    One row per folded name: the most used spelling, how many habits use it and
+    whether it is in the catalog. Grouped by exact name in the database, then
+    merged by folded name here.
+    """
+    names = {}
+    for nombre, usos in Habito.objects.values_list('nombre').annotate(usos=Count('pk')).order_by():
+        key = fold(nombre)[:100]
+        if not key:
+            continue
+        entry = names.setdefault(key, {'nombre': nombre, 'popularidad': 0, 'en_catalogo': False, 'mejor': 0})
+        entry['popularidad'] += usos
+        if usos > entry['mejor']:
+            entry['nombre'], entry['mejor'] = nombre, usos
+    for item in load_catalog():
+        key = fold(item['nombre'])
+        entry = names.setdefault(key, {'nombre': item['nombre'], 'popularidad': 0, 'en_catalogo': False, 'mejor': 0})
+        entry['en_catalogo'] = True
+    return [
+        NombreHabito(nombre_normalizado=key, nombre=e['nombre'], popularidad=e['popularidad'], en_catalogo=e['en_catalogo'])
+        for key, e in names.items()
+    ]
+
+
+def _rank(entry):
+    return (-entry.popularidad, not entry.en_catalogo, entry.nombre_normalizado)
+
+
+class Trie:
+    """
+    Prefix tree over the start of every word of every name. Entries are inserted
+    best first, so each node keeps the first `width` entries that reach it and a
+    lookup is one walk down the query plus a slice.
+    """
+
+    def __init__(self, entries, width):
+        self.entries = sorted(entries, key=_rank)
+        self.root = {}
+        for index, entry in enumerate(self.entries):
+            key = entry.nombre_normalizado
+            starts = [0] + [i + 1 for i, c in enumerate(key) if c == ' ']
+            for start in starts:
+                node = self.root
+                for c in key[start:]:
+                    node = node.setdefault(c, {})
+                    best = node.setdefault(None, [])
+                    # A name reaches a node once per matching word; keep it once
+                    if len(best) < width and (not best or best[-1] != index):
+                        best.append(index)
+
+    def search(self, prefix, limit):
+        node = self.root
+        for c in prefix:
+            node = node.get(c)
+            if node is None:
+                return []
+        return [self.entries[i] for i in node.get(None, [])[:limit]]
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        entries = list(NombreHabito.objects.all())
+        if not entries:
+            # Not built yet (fresh local database): compute the same rows in memory
+            entries = collect_names()
+        self._trie = Trie(entries, settings.AUTOCOMPLETE_MAX_LIMIT)
+        self._loaded_at = time.monotonic()
+
+    def trie(self):
+        if self._trie is None or time.monotonic() - self._loaded_at > settings.AUTOCOMPLETE_RELOAD:
+            with self._lock:
+                if self._trie is None or time.monotonic() - self._loaded_at > settings.AUTOCOMPLETE_RELOAD:
+                    self._load()
+        return self._trie
+
+    def invalidate(self):
+        self._trie = None
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def suggest(q, limit):
+    """
+    [{'nombre', 'popularidad', 'en_catalogo'}] for names with a word starting with q
+    (on Postgres, only the first word for queries shorter than TRIGRAM_MIN_LENGTH).
+    """
+    prefix = fold(q)
+    if not prefix:
+        return []
+    if connection.vendor != 'postgresql':
+        return [
+            {'nombre': e.nombre, 'popularidad': e.popularidad, 'en_catalogo': e.en_catalogo}
+            for e in autocomplete_index.trie().search(prefix, limit)
+        ]
+
+    escaped = _like_escape(prefix)
+    with connection.cursor() as cursor:
+        if len(prefix) < TRIGRAM_MIN_LENGTH:
+            cursor.execute(PREFIX_SQL, [escaped + '%', limit])
+        else:
+            cursor.execute(SEARCH_SQL, [escaped + '%', '% ' + escaped + '%', limit])
+        rows = cursor.fetchall()
+        if len(rows) < limit and len(prefix) >= TRIGRAM_MIN_LENGTH:
+            # Too few word-prefix matches: fill with close spellings (typos)
+            cursor.execute(FUZZY_SQL, [prefix, prefix, limit])
+            seen = {row[0] for row in rows}
+            rows += [row for row in cursor.fetchall() if row[0] not in seen][:limit - len(rows)]
+    return [{'nombre': n, 'popularidad': p, 'en_catalogo': c} for n, p, c in rows]
@@ -0,0 +1,34 @@
+"""
+Bulk row loading shared by generate_data and the habit import.
+
+copy_rows streams rows through COPY FROM STDIN (psycopg 3); insert_rows is the
+multi-row INSERT used on SQLite and with drivers that have no COPY.
+"""
+# SQLite allows 999 bound parameters per statement on older builds
+SQLITE_MAX_PARAMS = 999
+
+
+def supports_copy(connection, cursor):
+    return connection.vendor == 'postgresql' and hasattr(cursor.cursor, 'copy')
+
+
+def copy_rows(cursor, table, columns, rows):
+    with cursor.copy('COPY {} ({}) FROM STDIN'.format(table, ', '.join(columns))) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def insert_rows(cursor, table, columns, rows):
+    per_statement = max(1, SQLITE_MAX_PARAMS // len(columns))
+    placeholders = '({})'.format(', '.join(['%s'] * len(columns)))
+    for start in range(0, len(rows), per_statement):
+        batch = rows[start:start + per_statement]
+        cursor.execute(
+            'INSERT INTO {} ({}) VALUES {}'.format(table, ', '.join(columns), ', '.join([placeholders] * len(batch))),
+            [value for row in batch for value in row],
+        )
+
+
+def load_rows(connection, cursor, table, columns, rows):
+    """COPY when the connection supports it, multi-row INSERT otherwise."""
+    (copy_rows if supports_copy(connection, cursor) else insert_rows)(cursor, table, columns, rows)
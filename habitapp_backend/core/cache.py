@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import cache_lookup
+from .models import Usuario
+
+USER_CACHE_KEY = 'usuario:{}'
+
+
+def get_usuario(id_usuario):
+    """
+    Returns the Usuario row for id_usuario, served from the cache when possible.
+    Returns None if the user does not exist.
+    """
+    key = USER_CACHE_KEY.format(id_usuario)
+    user = cache_lookup('usuario', cache.get(key))
+    if user is None:
+        user = Usuario.objects.filter(id_usuario=id_usuario).first()
+        if user is not None:
+            cache.set(key, user, settings.USER_CACHE_TTL)
+    return user
+
+
+def invalidate_usuario(id_usuario):
+    cache.delete(USER_CACHE_KEY.format(id_usuario))
+
+
+# Per-user habit list, versioned by a generation counter. Writes only bump the
+# counter; entries of older generations are never read again and just expire.
+# The counter lives in the cache, so other workers only see a bump through a
+# shared backend (REDIS_URL); otherwise HABITOS_CACHE_TTL bounds the staleness.
+HABITOS_GEN_KEY = 'habitos:gen:{}'
+HABITOS_LIST_KEY = 'habitos:list:{}:{}'
+
+
+def get_habitos_generation(id_usuario):
+    key = HABITOS_GEN_KEY.format(id_usuario)
+    generation = cache.get(key)
+    if generation is None:
+        # Millisecond seed: if the counter is evicted, the new one can't reuse an old generation
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_habitos_generation(id_usuario):
+    try:
+        cache.incr(HABITOS_GEN_KEY.format(id_usuario))
+    except ValueError:
+        # No counter yet; the next read starts a fresh one
+        pass
+
+
+def get_cached_habitos(id_usuario, generation):
+    return cache_lookup('habitos', cache.get(HABITOS_LIST_KEY.format(id_usuario, generation)))
+
+
+def set_cached_habitos(id_usuario, generation, data):
+    cache.set(HABITOS_LIST_KEY.format(id_usuario, generation), data, settings.HABITOS_CACHE_TTL)
+
+
+# The stats summary shares the habit generation: any habit write invalidates
+# both. The day is part of the key because "today" and "last 7 days" move.
+STATS_SUMMARY_KEY = 'stats:summary:{}:{}:{}'
+
+
+def get_cached_stats(id_usuario, generation, day):
+    return cache_lookup('stats', cache.get(STATS_SUMMARY_KEY.format(id_usuario, generation, day.isoformat())))
+
+
+def set_cached_stats(id_usuario, generation, day, data):
+    cache.set(STATS_SUMMARY_KEY.format(id_usuario, generation, day.isoformat()), data, settings.STATS_CACHE_TTL)
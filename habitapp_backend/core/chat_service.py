@@ -1,6 +1,8 @@
 import os
+import time
 from openai import OpenAI
 from django.conf import settings
+from .metrics import CHAT_SECONDS, CHAT_TOKENS
 
 class ChatService:
     def __init__(self):
@@ -40,12 +42,21 @@ class ChatService:
             # Prepend system prompt to context
             full_messages = [system_prompt] + messages
 
-            response = self.client.chat.completions.create(
-                model="openai/gpt-oss-120b", # Or gpt-4 if available/preferred
-                messages=full_messages,
-                temperature=0.7,
-                max_tokens=300
-            )
+            start = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model="openai/gpt-oss-120b", # Or gpt-4 if available/preferred
+                    messages=full_messages,
+                    temperature=0.7,
+                    max_tokens=300
+                )
+            except Exception:
+                CHAT_SECONDS.labels('error').observe(time.perf_counter() - start)
+                raise
+            CHAT_SECONDS.labels('ok').observe(time.perf_counter() - start)
+            if response.usage is not None:
+                CHAT_TOKENS.labels('prompt').inc(response.usage.prompt_tokens or 0)
+                CHAT_TOKENS.labels('completion').inc(response.usage.completion_tokens or 0)
 
             return response.choices[0].message.content
         except Exception as e:
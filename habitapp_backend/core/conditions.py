@@ -0,0 +1,178 @@
+"""
+Condition language for Logro.condicion, compiled to SQL predicates over perfiles.
+
+    racha_maxima >= 30 AND habitos_completados >= 100
+    (puntos_totales > 500 OR categorias_distintas >= 3) AND NOT racha_actual = 0
+
+Metrics are Perfil counters or aggregates over the user's habits. The old frontend
+requirement strings ('racha_30', 'points_1000', ...) are accepted as shorthands.
+The compiled predicate refers to the profile row as `p`.
+"""
+import re
+from functools import lru_cache
+
+PROFILE_METRICS = {
+    'puntos_totales': 'p.puntos_totales',
+    'racha_actual': 'p.racha_actual',
+    'racha_maxima': 'p.racha_maxima',
+    'num_habitos_creados': 'p.num_habitos_creados',
+    'habitos_completados': 'p.habitos_completados',
+    'num_logros_obtenidos': 'p.num_logros_obtenidos',
+    'meta_diaria': 'p.meta_diaria',
+}
+
+HISTORY_METRICS = {
+    'habitos_totales': '(SELECT COUNT(*) FROM habitos h WHERE h.id_usuario = p.id_usuario)',
+    'habitos_pendientes': "(SELECT COUNT(*) FROM habitos h WHERE h.id_usuario = p.id_usuario AND h.estado = 'pendiente')",
+    'categorias_distintas': '(SELECT COUNT(DISTINCT h.categoria) FROM habitos h WHERE h.id_usuario = p.id_usuario)',
+    'dias_con_completados': "(SELECT COUNT(DISTINCT h.fecha) FROM habitos h WHERE h.id_usuario = p.id_usuario AND h.estado = 'completado')",
+}
+
+SHORTHANDS = {
+    'racha': 'racha_maxima',
+    'habits': 'num_habitos_creados',
+    'completed': 'habitos_completados',
+    'points': 'puntos_totales',
+}
+SHORTHAND_RE = re.compile(r'^\s*(racha|habits|completed|points)_(\d+)\s*$')
+
+OPERATORS = {'>=', '<=', '>', '<', '=', '!='}
+TOKEN_RE = re.compile(r'\s*(?:(\d+)|(>=|<=|!=|>|<|=)|([()])|([A-Za-z_][A-Za-z0-9_]*))')
+
+
+class ConditionError(ValueError):
+    pass
+
+
+class Comparison:
+    def __init__(self, metric, op, value):
+        self.metric, self.op, self.value = metric, op, value
+
+
+class BoolOp:
+    def __init__(self, op, operands):
+        self.op, self.operands = op, operands
+
+
+class Not:
+    def __init__(self, operand):
+        self.operand = operand
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ConditionError('Unexpected input at position {}: {!r}'.format(pos, text[pos:pos + 10]))
+        number, op, paren, word = match.groups()
+        if number is not None:
+            tokens.append(('num', int(number)))
+        elif op is not None:
+            tokens.append(('op', op))
+        elif paren is not None:
+            tokens.append((paren, paren))
+        elif word.upper() in ('AND', 'OR', 'NOT'):
+            tokens.append((word.upper(), word.upper()))
+        else:
+            tokens.append(('name', word))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent: or_expr := and_expr (OR and_expr)*; and_expr := not_expr (AND not_expr)*."""
+
+    def __init__(self, tokens):
+        self.tokens, self.pos = tokens, 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind):
+        if self.peek() != kind:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else 'end of condition'
+            raise ConditionError('Expected {}, found {!r}'.format(kind, found))
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token[1]
+
+    def parse(self):
+        node = self.or_expr()
+        if self.pos != len(self.tokens):
+            raise ConditionError('Unexpected {!r}'.format(self.tokens[self.pos][1]))
+        return node
+
+    def or_expr(self):
+        operands = [self.and_expr()]
+        while self.peek() == 'OR':
+            self.take('OR')
+            operands.append(self.and_expr())
+        return operands[0] if len(operands) == 1 else BoolOp('OR', operands)
+
+    def and_expr(self):
+        operands = [self.not_expr()]
+        while self.peek() == 'AND':
+            self.take('AND')
+            operands.append(self.not_expr())
+        return operands[0] if len(operands) == 1 else BoolOp('AND', operands)
+
+    def not_expr(self):
+        if self.peek() == 'NOT':
+            self.take('NOT')
+            return Not(self.not_expr())
+        if self.peek() == '(':
+            self.take('(')
+            node = self.or_expr()
+            self.take(')')
+            return node
+        metric = self.take('name')
+        if metric not in PROFILE_METRICS and metric not in HISTORY_METRICS:
+            raise ConditionError('Unknown metric {!r}'.format(metric))
+        op = self.take('op')
+        return Comparison(metric, op, self.take('num'))
+
+
+def parse(condicion):
+    shorthand = SHORTHAND_RE.match(condicion or '')
+    if shorthand:
+        return Comparison(SHORTHANDS[shorthand.group(1)], '>=', int(shorthand.group(2)))
+    if not condicion or not condicion.strip():
+        raise ConditionError('Empty condition')
+    return Parser(tokenize(condicion)).parse()
+
+
+def _to_sql(node, params):
+    if isinstance(node, Comparison):
+        column = PROFILE_METRICS.get(node.metric) or HISTORY_METRICS[node.metric]
+        params.append(node.value)
+        return '{} {} %s'.format(column, '<>' if node.op == '!=' else node.op)
+    if isinstance(node, Not):
+        return 'NOT ({})'.format(_to_sql(node.operand, params))
+    return '({})'.format(' {} '.format(node.op).join(_to_sql(o, params) for o in node.operands))
+
+
+@lru_cache(maxsize=256)
+def compile_condition(condicion):
+    """Returns (sql, params): a WHERE predicate over `perfiles p`. Raises ConditionError."""
+    params = []
+    sql = _to_sql(parse(condicion), params)
+    return sql, tuple(params)
+
+
+def as_threshold(condicion):
+    """
+    (profile field, threshold) when the condition is a single `field >= N` (or `> N`)
+    on a profile counter, which the incremental engine can bisect. None otherwise.
+    """
+    try:
+        node = parse(condicion)
+    except ConditionError:
+        return None
+    if isinstance(node, Comparison) and node.metric in PROFILE_METRICS:
+        if node.op == '>=':
+            return node.metric, node.value
+        if node.op == '>':
+            return node.metric, node.value + 1
+    return None
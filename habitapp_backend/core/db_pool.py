@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import connections
+
+
+def warm_pool(alias='default', timeout=10.0):
+    """
+    Opens the connection pool and waits until min_size connections are ready,
+    so the first requests of a fresh worker don't pay for TLS handshakes.
+    Does nothing when pooling is disabled or the database is not Postgres.
+    """
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return False
+    try:
+        pool.open(wait=True, timeout=timeout)
+    except Exception as e:
+        # The server still starts; connections are then opened on demand
+        print(f"WARNING: could not pre-warm database pool '{alias}': {e}")
+        return False
+    return True
+
+
+def pool_stats():
+    """
+    Per-process pool statistics for every pooled alias: size, idle connections,
+    waiting requests, total checkouts and time spent waiting for a connection.
+    """
+    stats = {}
+    for alias in settings.DATABASES:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_CACHE_KEY = 'db:sticky:{}'
+
+# Alias used for reads in the current request/thread; None means the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN pg_is_in_recovery() '
+        'THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) '
+        'ELSE 0 END'
+    ),
+}
+
+
+class ReplicaHealth:
+    """
+    Tracks which replicas are usable. Each replica is probed at most every
+    REPLICA_CHECK_INTERVAL seconds per process; one that is down or lags more
+    than REPLICA_MAX_LAG seconds is skipped until the next probe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._healthy = []
+        self._checked_at = None
+
+    def _lag(self, alias):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL.get(connection.vendor, 'SELECT 0'))
+            return float(cursor.fetchone()[0] or 0)
+
+    def _probe(self):
+        healthy = []
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                if self._lag(alias) <= settings.REPLICA_MAX_LAG:
+                    healthy.append(alias)
+            except Exception as e:
+                print(f"WARNING: replica '{alias}' unavailable: {e}")
+        self._healthy = healthy
+        self._checked_at = time.monotonic()
+
+    def healthy_replicas(self):
+        if not settings.DATABASE_REPLICAS:
+            return []
+        if self._checked_at is None or time.monotonic() - self._checked_at > settings.REPLICA_CHECK_INTERVAL:
+            with self._lock:
+                if self._checked_at is None or time.monotonic() - self._checked_at > settings.REPLICA_CHECK_INTERVAL:
+                    self._probe()
+        return self._healthy
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica():
+    """Returns a healthy replica alias, or 'default' when none is available."""
+    healthy = replica_health.healthy_replicas()
+    return random.choice(healthy) if healthy else 'default'
+
+
+def mark_recent_write(id_usuario):
+    cache.set(STICKY_CACHE_KEY.format(id_usuario), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def has_recent_write(id_usuario):
+    return cache.get(STICKY_CACHE_KEY.format(id_usuario)) is not None
+
+
+@contextmanager
+def read_from_replica(id_usuario=None):
+    """
+    Sends ORM reads inside the block to a replica. Pass id_usuario to honour
+    read-your-writes: a user who wrote recently keeps reading from the primary.
+    """
+    alias = 'default'
+    if id_usuario is None or not has_recent_write(id_usuario):
+        alias = choose_replica()
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Reads go to the primary unless the code runs inside read_from_replica()
+    (or a ReplicaReadMixin view). Writes and migrations always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    For read-heavy DRF views: safe-method requests are served from a replica,
+    unless the user wrote within the last REPLICA_STICKY_SECONDS.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._replica_cm = read_from_replica(getattr(request.user, 'id_usuario', None))
+            self._replica_cm.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_cm = getattr(self, '_replica_cm', None)
+        if replica_cm is not None:
+            self._replica_cm = None
+            replica_cm.__exit__(None, None, None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Remembers users who just made a successful write, so their next reads skip
+    the replicas for REPLICA_STICKY_SECONDS (read-your-writes).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF copies the authenticated user onto the Django request
+            id_usuario = getattr(getattr(request, 'user', None), 'id_usuario', None)
+            if id_usuario is not None:
+                mark_recent_write(id_usuario)
+        return response
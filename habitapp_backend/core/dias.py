@@ -0,0 +1,60 @@
+"""
+Habito.dias as a 7-bit mask: bit 0 is Monday ... bit 6 is Sunday, matching
+date.weekday(). The string column keeps whatever the client sent; dias_mask
+mirrors the set of days it names ("Lun,Mar,Mie").
+
+The frontend stores a weekly frequency there instead, as "Mon" repeated that
+many times (src/App.tsx). Those strings, and any string naming a day twice, are
+not a set of days: such habits are due every day, as are habits naming no
+recognisable day. A habit due on Mondays only is written "Lun".
+"""
+from .text import fold
+
+ALL_DAYS = 0b1111111
+
+# First three letters, lower case and without accents, in Spanish and English
+DAY_BITS = {
+    'lun': 0, 'mon': 0,
+    'mar': 1, 'tue': 1,
+    'mie': 2, 'wed': 2,
+    'jue': 3, 'thu': 3,
+    'vie': 4, 'fri': 4,
+    'sab': 5, 'sat': 5,
+    'dom': 6, 'sun': 6,
+}
+DAY_NAMES = ('Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom')
+# What the frontend repeats once per weekly occurrence
+FREQUENCY_TOKEN = 'mon'
+
+
+def _day_key(token):
+    return fold(token)[:3]
+
+
+def unknown_days(dias):
+    """Tokens of a dias string that do not name a day."""
+    return [t for t in (dias or '').split(',') if t.strip() and _day_key(t) not in DAY_BITS]
+
+
+def is_frequency(tokens):
+    """True for the frontend's frequency encoding ("Mon", "Mon,Mon", ...)."""
+    return bool(tokens) and all(t.lower() == FREQUENCY_TOKEN for t in tokens)
+
+
+def dias_to_mask(dias):
+    tokens = [t.strip() for t in (dias or '').split(',') if t.strip()]
+    bits = [DAY_BITS[_day_key(t)] for t in tokens if _day_key(t) in DAY_BITS]
+    if is_frequency(tokens) or len(bits) != len(set(bits)):
+        return ALL_DAYS
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask or ALL_DAYS
+
+
+def mask_to_dias(mask):
+    return ','.join(name for bit, name in enumerate(DAY_NAMES) if mask & (1 << bit))
+
+
+def day_bit(day):
+    return 1 << day.weekday()
@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = 503
+    default_detail = 'Servidor ocupado, inténtalo de nuevo en unos segundos.'
+    default_code = 'hashing_busy'
+    wait = 1  # Sent as Retry-After by DRF's exception handler
+
+
+# Run inside the pool processes. They only need the hasher settings, which
+# django.conf.settings loads lazily from DJANGO_SETTINGS_MODULE.
+
+def _check(password, encoded):
+    started = time.time()
+    ok = hashers.check_password(password, encoded)
+    must_update = ok and hashers.identify_hasher(encoded).must_update(encoded)
+    return ok, must_update, started
+
+
+def _make(password):
+    started = time.time()
+    return hashers.make_password(password), started
+
+
+class HashingPool:
+    """
+    Bounded process pool for PBKDF2 work, so password hashing does not compete
+    with the request workers for CPU. At most PASSWORD_HASHING_MAX_PENDING jobs
+    are queued or running; beyond that requests fail fast with HashingBusy, as
+    do requests whose job is not done within PASSWORD_HASHING_TIMEOUT.
+    With PASSWORD_HASHING_WORKERS = 0 hashing runs inline.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING_MAX_PENDING)
+        self.stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'rehashed': 0,
+            'queue_time_total': 0.0,
+            'queue_time_max': 0.0,
+            'run_time_total': 0.0,
+        }
+
+    def _get_executor(self):
+        # Created lazily so every forked server worker gets its own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS)
+        return self._executor
+
+    def _run(self, fn, *args):
+        if settings.PASSWORD_HASHING_WORKERS == 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.count('rejected')
+            raise HashingBusy()
+        submitted = time.time()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job finishes, even if this request stops waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+        except FutureTimeout:
+            self.count('timed_out')
+            raise HashingBusy()
+        finished = time.time()
+
+        started = result[-1]
+        queue_time = max(0.0, started - submitted)
+        with self._lock:
+            self.stats['submitted'] += 1
+            self.stats['queue_time_total'] += queue_time
+            self.stats['queue_time_max'] = max(self.stats['queue_time_max'], queue_time)
+            self.stats['run_time_total'] += finished - started
+        return result
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def check_password(self, password, encoded):
+        """Returns (is_correct, must_update)."""
+        ok, must_update, _ = self._run(_check, password, encoded)
+        return ok, must_update
+
+    def make_password(self, password):
+        encoded, _ = self._run(_make, password)
+        return encoded
+
+
+hashing_pool = HashingPool()
+
+
+def check_password(user, password):
+    """
+    Checks the password off the request worker. If the stored hash uses outdated
+    hasher parameters it is transparently upgraded.
+    """
+    ok, must_update = hashing_pool.check_password(password, user.password)
+    if ok and must_update:
+        # Imported here: the pool processes import this module without the app registry
+        from .cache import invalidate_usuario
+        from .models import Usuario
+
+        user.password = hashing_pool.make_password(password)
+        # update() skips the audit log signal, which would otherwise store the hash
+        Usuario.objects.filter(pk=user.pk).update(password=user.password)
+        invalidate_usuario(user.pk)
+        hashing_pool.count('rehashed')
+    return ok
+
+
+def make_password(password):
+    return hashing_pool.make_password(password)
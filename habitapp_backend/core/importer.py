@@ -0,0 +1,243 @@
+"""
+Bulk import of a user's habit history from CSV or NDJSON.
+
+    POST /api/habitos/import/        multipart "file", or a raw text/csv or
+                                     application/x-ndjson body (?file_format=,
+                                     ?skip_invalid=true)
+    python manage.py import_habits --user ana historial.csv
+
+Columns (CSV header or NDJSON keys): nombre, descripcion, puntos, fecha,
+categoria, dias, estado; others are ignored. The file is read as a stream and
+validated in batches of IMPORT_BATCH_SIZE rows; each valid batch is loaded with
+COPY FROM STDIN on Postgres (ids reserved from the sequence first) or a
+multi-row INSERT elsewhere, habitos and usuario_habito alike. Everything runs in
+one transaction: by default any invalid row rejects the whole file, with
+`skip_invalid` the bad rows are only reported.
+
+Per-row signals are skipped, so the profile counters are recomputed once at the
+end, as reconcile_profiles would, and achievements crossed by the new totals
+are awarded.
+"""
+import codecs
+import csv
+import logging
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .achievements import achievement_engine
+from .bulk import copy_rows, insert_rows, supports_copy
+from .cache import bump_habitos_generation
+from .dias import dias_to_mask, unknown_days
+from .models import Habito, Perfil
+from .reconcile import DAY_NUMBER, FIELDS, apply_fixes, compute_drift
+from .renderers import loads
+from .streaming import chunked
+from .write_behind import profile_write_behind
+
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'ndjson': ('application/x-ndjson', '.ndjson', '.jsonl'),
+}
+ESTADOS = ('pendiente', 'completado')
+HABITO_COLUMNS = ('id_habito', 'nombre', 'descripcion', 'puntos', 'fecha', 'categoria', 'dias', 'dias_mask', 'estado', 'id_usuario')
+LINK_COLUMNS = ('id_usuario', 'id_habito')
+# Set by read_rows on records that could not be read as a row
+ROW_ERROR = '_error'
+
+logger = logging.getLogger('core.import')
+
+
+class ImportRejected(Exception):
+    """
+    The file was not imported. `errors` lists [{'linea', 'error'}]; `invalid`
+    counts the invalid rows (0 when the file itself could not be read).
+    """
+
+    def __init__(self, errors, invalid=0):
+        super().__init__('; '.join('línea {linea}: {error}'.format(**e) for e in errors))
+        self.errors = errors
+        self.invalid = invalid
+
+
+def import_format(fmt=None, name='', content_type=''):
+    """'csv' or 'ndjson' from an explicit format, the file name or the content type; None if unknown."""
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    name, content_type = (name or '').lower(), (content_type or '').split(';')[0].strip().lower()
+    for key, (mime, *extensions) in FORMATS.items():
+        if content_type == mime or name.endswith(tuple(extensions)):
+            return key
+    return None
+
+
+def read_rows(fileobj, fmt):
+    """(line number, dict) for every record of a binary file, decoded as UTF-8 (BOM allowed)."""
+    lines = codecs.iterdecode(fileobj, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or 'nombre' not in [f.strip() for f in reader.fieldnames]:
+            raise ImportRejected([{'linea': 1, 'error': 'La cabecera CSV debe incluir la columna nombre.'}])
+        reader.fieldnames = [f.strip() for f in reader.fieldnames]
+        for raw in reader:
+            # DictReader keeps surplus cells under None and fills missing ones with None
+            # (an empty cell is ''), so a shifted row would otherwise import silently
+            cells = sum(v is not None for k, v in raw.items() if k is not None) + len(raw.get(None, ()))
+            if cells != len(reader.fieldnames):
+                raw = {ROW_ERROR: 'La fila tiene {} columnas y la cabecera {}.'.format(cells, len(reader.fieldnames))}
+            yield reader.line_num, raw
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = loads(line)
+        except ValueError:
+            raw = None
+        yield number, raw if isinstance(raw, dict) else {ROW_ERROR: 'No es un objeto JSON.'}
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def clean_row(raw, today):
+    """The habitos values for one record (as HabitoSerializer would accept it), or ValueError."""
+    if ROW_ERROR in raw:
+        raise ValueError(raw[ROW_ERROR])
+    errors = []
+
+    nombre = _text(raw.get('nombre'))
+    if nombre is None:
+        errors.append('nombre: obligatorio')
+    elif len(nombre) > 100:
+        errors.append('nombre: máximo 100 caracteres')
+    categoria = _text(raw.get('categoria'))
+    if categoria is not None and len(categoria) > 100:
+        errors.append('categoria: máximo 100 caracteres')
+    dias = _text(raw.get('dias'))
+    if dias is not None:
+        if len(dias) > 50:
+            errors.append('dias: máximo 50 caracteres')
+        unknown = unknown_days(dias)
+        if unknown:
+            errors.append('dias: Días no reconocidos: {}'.format(', '.join(t.strip() for t in unknown)))
+
+    puntos = raw.get('puntos')
+    try:
+        puntos = 0 if _text(puntos) is None else int(puntos)
+        if isinstance(raw.get('puntos'), bool) or puntos < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append('puntos: debe ser un entero no negativo')
+    fecha = _text(raw.get('fecha'))
+    try:
+        fecha = today if fecha is None else date.fromisoformat(fecha[:10])
+    except ValueError:
+        errors.append('fecha: formato inválido, usa YYYY-MM-DD')
+    estado = (_text(raw.get('estado')) or 'pendiente').lower()
+    if estado not in ESTADOS:
+        errors.append('estado: debe ser pendiente o completado')
+
+    if errors:
+        raise ValueError('; '.join(errors))
+    return nombre, _text(raw.get('descripcion')), puntos, fecha, categoria, dias, dias_to_mask(dias), estado
+
+
+class HabitImport:
+    """
+    One import into one user's history. `progress(imported, invalid, line)` is
+    called after every batch; by default it logs on 'core.import'.
+    """
+
+    def __init__(self, id_usuario, batch_size=None, skip_invalid=False, progress=None):
+        self.id_usuario = id_usuario
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.skip_invalid = skip_invalid
+        self.progress = progress or self.log_progress
+        self.imported = 0
+        self.invalid = 0
+        self.errors = []
+
+    def run(self, fileobj, fmt):
+        """Imports the file; returns the summary or raises ImportRejected (nothing written)."""
+        started = time.perf_counter()
+        today = date.today()
+        try:
+            with transaction.atomic():
+                line = 0
+                for batch in chunked(read_rows(fileobj, fmt), self.batch_size):
+                    rows = []
+                    for line, raw in batch:
+                        try:
+                            rows.append(clean_row(raw, today))
+                        except ValueError as e:
+                            self.invalid += 1
+                            if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+                                self.errors.append({'linea': line, 'error': str(e)})
+                    if self.invalid and not self.skip_invalid:
+                        # Stop at the first batch with errors; nothing is kept
+                        raise ImportRejected(self.errors, self.invalid)
+                    if rows:
+                        self.load(rows)
+                        self.imported += len(rows)
+                    self.progress(self.imported, self.invalid, line)
+                if not self.imported and not self.invalid:
+                    raise ImportRejected([{'linea': line, 'error': 'El archivo no contiene filas.'}])
+                logros = self.recompute_profile() if self.imported else 0
+        except UnicodeDecodeError:
+            raise ImportRejected([{'linea': 0, 'error': 'El archivo debe estar codificado en UTF-8.'}])
+        except csv.Error as e:
+            raise ImportRejected([{'linea': 0, 'error': 'CSV inválido: {}'.format(e)}])
+        bump_habitos_generation(self.id_usuario)
+        return {
+            'importados': self.imported,
+            'invalidos': self.invalid,
+            'errores': self.errors,
+            'logros_nuevos': logros,
+            'segundos': round(time.perf_counter() - started, 3),
+        }
+
+    def log_progress(self, imported, invalid, line):
+        logger.info('import id_usuario=%s: %s rows imported, %s invalid (line %s)', self.id_usuario, imported, invalid, line)
+
+    def load(self, rows):
+        with connection.cursor() as cursor:
+            if supports_copy(connection, cursor):
+                # Reserve the ids, then copy both tables with them
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence('habitos', 'id_habito')) FROM generate_series(1, %s)",
+                    [len(rows)],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                copy_rows(cursor, 'habitos', HABITO_COLUMNS, [(i, *row, self.id_usuario) for i, row in zip(ids, rows)])
+                copy_rows(cursor, 'usuario_habito', LINK_COLUMNS, [(self.id_usuario, i) for i in ids])
+                return
+            # bulk_create is a multi-row INSERT and returns the new ids (RETURNING)
+            habitos = Habito.objects.bulk_create([
+                Habito(
+                    nombre=nombre, descripcion=descripcion, puntos=puntos, fecha=fecha, categoria=categoria,
+                    dias=dias, dias_mask=dias_mask, estado=estado, usuario_id=self.id_usuario,
+                )
+                for nombre, descripcion, puntos, fecha, categoria, dias, dias_mask, estado in rows
+            ])
+            insert_rows(cursor, 'usuario_habito', LINK_COLUMNS, [(self.id_usuario, h.id_habito) for h in habitos])
+
+    def recompute_profile(self):
+        """Counters from the tables, like reconcile_profiles --fix; returns the achievements awarded."""
+        if profile_write_behind.enabled:
+            # This process's pending deltas are already in the tables being counted
+            profile_write_behind.flush()
+        fields = FIELDS if connection.vendor in DAY_NUMBER else FIELDS[:4]
+        drift = compute_drift(self.id_usuario, self.id_usuario, fields).get(self.id_usuario)
+        if not drift:
+            return 0
+        apply_fixes({self.id_usuario: drift})
+        before = {field: current for field, (current, _) in drift.items() if field in Perfil.COUNTER_FIELDS}
+        after = {field: expected for field, (_, expected) in drift.items() if field in Perfil.COUNTER_FIELDS}
+        return achievement_engine.on_counters_changed(self.id_usuario, before, after)
@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.achievements import achievement_engine
+from core.bulk import SQLITE_MAX_PARAMS, insert_rows
+from core.conditions import ConditionError, compile_condition
+from core.models import Logro
+from core.streaming import chunked
+
+QUALIFYING_SQL = """
+SELECT p.id_usuario FROM perfiles p
+WHERE {predicate}
+AND NOT EXISTS (
+    SELECT 1 FROM usuario_logro ul WHERE ul.id_usuario = p.id_usuario AND ul.id_logro = %s
+)
+"""
+
+# Same shape as the engine's AWARD_SQL_POSTGRES: a pair it commits meanwhile is
+# skipped, and only the rows actually inserted bump the counter
+AWARD_SQL_POSTGRES = """
+WITH nuevos AS (
+    INSERT INTO usuario_logro (id_usuario, id_logro, fecha_obtencion)
+    SELECT p.id_usuario, %s, %s FROM perfiles p
+    WHERE {predicate}
+    AND NOT EXISTS (
+        SELECT 1 FROM usuario_logro ul WHERE ul.id_usuario = p.id_usuario AND ul.id_logro = %s
+    )
+    ON CONFLICT DO NOTHING
+    RETURNING id_usuario
+)
+UPDATE perfiles SET num_logros_obtenidos = num_logros_obtenidos + 1
+WHERE id_usuario IN (SELECT id_usuario FROM nuevos)
+"""
+
+
+def award(logro, predicate, params, stamp):
+    """Inserts the missing UsuarioLogro rows for one achievement; returns how many."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                AWARD_SQL_POSTGRES.format(predicate=predicate),
+                [logro.id_logro, stamp, *params, logro.id_logro],
+            )
+            return cursor.rowcount
+
+        # Portable fallback (SQLite stand-ins, one writer at a time): pick the
+        # users, then insert and bump exactly those ids
+        cursor.execute(QUALIFYING_SQL.format(predicate=predicate), [*params, logro.id_logro])
+        ids = [row[0] for row in cursor.fetchall()]
+        insert_rows(cursor, 'usuario_logro', ('id_usuario', 'id_logro', 'fecha_obtencion'),
+                    [(id_usuario, logro.id_logro, stamp) for id_usuario in ids])
+        for batch in chunked(ids, SQLITE_MAX_PARAMS):
+            cursor.execute(
+                'UPDATE perfiles SET num_logros_obtenidos = num_logros_obtenidos + 1 '
+                'WHERE id_usuario IN ({})'.format(', '.join(['%s'] * len(batch))),
+                batch,
+            )
+        return len(ids)
+
+
+class Command(BaseCommand):
+    help = (
+        'Award achievements to every qualifying user. Each condition is compiled to '
+        'SQL and applied set-wise, one INSERT per achievement.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logros', nargs='*', type=int, help='id_logro to backfill (default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate and show the compiled conditions')
+
+    def handle(self, *args, **options):
+        logros = Logro.objects.exclude(condicion__isnull=True).exclude(condicion='').order_by('id_logro')
+        if options['logros']:
+            logros = logros.filter(id_logro__in=options['logros'])
+
+        total = 0
+        for logro in logros:
+            try:
+                predicate, params = compile_condition(logro.condicion)
+            except ConditionError as e:
+                self.stderr.write('Skipping "{}" ({}): {}'.format(logro.nombre, logro.condicion, e))
+                continue
+
+            if options['dry_run']:
+                self.stdout.write('{}: {}  {}'.format(logro.nombre, predicate, list(params)))
+                continue
+
+            awarded = award(logro, predicate, params, timezone.now())
+            total += awarded
+            self.stdout.write('{}: {} users'.format(logro.nombre, awarded))
+
+        if options['logros'] and not logros.exists():
+            raise CommandError('No achievements with a condition match {}'.format(options['logros']))
+        achievement_engine.invalidate()
+        self.stdout.write(self.style.SUCCESS('Awarded {} achievements'.format(total)))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.autocomplete import collect_names
+from core.models import NombreHabito
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild nombres_habito, the suggestion source of /api/habitos/autocomplete/, from the '
+        'catalog in base.pl and the habit names in use. Meant to run periodically, e.g. from cron.'
+    )
+
+    def handle(self, *args, **options):
+        names = collect_names()
+        with transaction.atomic():
+            NombreHabito.objects.all().delete()
+            NombreHabito.objects.bulk_create(names, batch_size=1000)
+        catalog = sum(1 for n in names if n.en_catalogo)
+        self.stdout.write(self.style.SUCCESS(
+            'Stored {} names ({} from the catalog)'.format(len(names), catalog)
+        ))
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Recomendacion, Usuario
+from core.recommender import Recommender
+
+
+class Command(BaseCommand):
+    help = (
+        'Score the habit catalog (categoria_habito facts in base.pl) for every user and store '
+        'the top K in recomendaciones. Meant to run nightly, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.RECOMMENDATIONS_TOP_K)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        recommender = Recommender()
+        recommender.fit_prior()
+        self.stdout.write('Catalog: {} habits in {} categories'.format(
+            len(recommender.catalog), len(recommender.categorias)
+        ))
+
+        last_id, users, rows = 0, 0, 0
+        while True:
+            ids = list(
+                Usuario.objects.filter(id_usuario__gt=last_id).order_by('id_usuario')
+                .values_list('id_usuario', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            top = recommender.top_k(ids, options['top_k'])
+            batch = [
+                Recomendacion(
+                    id_usuario=id_usuario, posicion=posicion, score=round(score, 4), fecha_calculo=started,
+                    **recommender.catalog[j],
+                )
+                for id_usuario, ranked in top.items()
+                for posicion, (j, score) in enumerate(ranked, start=1)
+            ]
+            # Swap each chunk atomically so readers never see a partial list
+            with transaction.atomic():
+                Recomendacion.objects.filter(id_usuario__in=ids).delete()
+                Recomendacion.objects.bulk_create(batch)
+            users += len(ids)
+            rows += len(batch)
+            last_id = ids[-1]
+            self.stdout.write('Scored {} users'.format(users))
+
+        # Users deleted since the last run
+        stale, _ = Recomendacion.objects.filter(fecha_calculo__lt=started).delete()
+        self.stdout.write(self.style.SUCCESS(
+            'Stored {} recommendations for {} users, removed {} stale'.format(rows, users, stale)
+        ))
@@ -0,0 +1,243 @@
+import json
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max
+
+from core.bulk import load_rows
+from core.dias import dias_to_mask
+from core.hashing import make_password
+from core.models import Habito, Usuario, UsuarioLog
+from core.recommender import load_catalog
+
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+PASSWORD = 'GeneratedPassword123'
+
+DIAS_PATTERNS = (
+    ('Lun,Mar,Mie,Jue,Vie,Sab,Dom', 5), ('Lun,Mar,Mie,Jue,Vie', 3), ('Lun,Mie,Vie', 2),
+    ('Mar,Jue', 1), ('Sab,Dom', 1),
+)
+ZONAS = ('America/Mexico_City', 'America/Bogota', 'America/Lima', 'America/Argentina/Buenos_Aires', 'Europe/Madrid')
+
+COLUMNS = {
+    'usuarios': ('id_usuario', 'username', 'email', 'password_hash', 'fecha_creacion', 'last_login'),
+    'perfiles': (
+        'id_usuario', 'puntos_totales', 'racha_actual', 'racha_maxima', 'num_habitos_creados',
+        'habitos_completados', 'num_logros_obtenidos', 'meta_diaria',
+    ),
+    'preferencias': ('id_usuario', 'modo_oscuro', 'notificaciones_push', 'notificaciones_email', 'zona_horaria', 'idioma'),
+    'habitos': ('id_habito', 'nombre', 'puntos', 'fecha', 'categoria', 'dias', 'dias_mask', 'estado', 'id_usuario'),
+    'usuario_habito': ('id_usuario', 'id_habito'),
+    'usuario_logs': ('id_usuario', 'accion', 'fecha', 'datos_nuevos'),
+}
+# Parents first, so every chunk satisfies its own foreign keys
+TABLE_ORDER = ('usuarios', 'perfiles', 'preferencias', 'habitos', 'usuario_habito', 'usuario_logs')
+
+
+def geometric(rng, p):
+    """Run length when each further step happens with probability p (mean 1 / (1 - p))."""
+    return 1 + int(math.log(1.0 - rng.random()) / math.log(p))
+
+
+def completion_days(rng, n, consistency, joined, end):
+    """
+    Dates for n completed habits, laid out as streaks (islands) walking back from
+    `end`: island lengths are geometric in the user's consistency, gaps shrink as
+    it grows. Returns the dates plus the current and longest streak, computed the
+    way reconcile_profiles does.
+    """
+    days, streaks = [], []
+    cursor = end - timedelta(days=0 if rng.random() < consistency else geometric(rng, 1 - consistency))
+    current = 0
+    while len(days) < n and cursor >= joined:
+        length = min(geometric(rng, consistency), n - len(days), (cursor - joined).days + 1)
+        days.extend(cursor - timedelta(days=i) for i in range(length))
+        if not streaks and cursor >= end - timedelta(days=1):
+            current = length
+        streaks.append(length)
+        cursor -= timedelta(days=length + geometric(rng, 1 - consistency))
+    return days, current, max(streaks, default=0)
+
+
+def generate_chunk(seed, index, first_user, first_habit, users, options, password):
+    """
+    Rows of every table for one chunk of users. `users` holds each user's
+    (activity, number of habits), drawn by the parent so habit ids are known
+    up front; everything else comes from a generator seeded per chunk, so the
+    output does not depend on the number of workers.
+    """
+    rng = random.Random('{}:{}'.format(seed, index))
+    catalog = load_catalog()
+    categorias = sorted({item['categoria'] for item in catalog})
+    por_categoria = {c: [item for item in catalog if item['categoria'] == c] for c in categorias}
+    popularidad = [1.0 / (rank + 1) for rank in range(len(categorias))]  # Zipf over categories
+    patterns, pattern_weights = zip(*DIAS_PATTERNS)
+    masks = {pattern: dias_to_mask(pattern) for pattern in patterns}
+    end = options['end_date']
+    horizon = options['days']
+
+    rows = {table: [] for table in TABLE_ORDER}
+    id_habito = first_habit
+    for offset, (activity, n_habits) in enumerate(users):
+        id_usuario = first_user + offset
+        username = '{}{}'.format(options['prefix'], id_usuario)
+        email = '{}@example.com'.format(username)
+        joined = end - timedelta(days=rng.randint(0, horizon))
+        creado = datetime.combine(joined, dt_time(rng.randint(6, 23), rng.randint(0, 59)), tzinfo=dt_timezone.utc)
+        last_login = creado + timedelta(days=rng.randint(0, (end - joined).days)) if n_habits else None
+
+        # Active users are also the consistent ones
+        consistency = min(0.95, rng.betavariate(2, 3) + 0.1 * math.log(activity))
+        n_completed = sum(1 for _ in range(n_habits) if rng.random() < 0.3 + 0.6 * consistency)
+        dates, racha_actual, racha_maxima = completion_days(rng, n_completed, consistency, joined, end)
+        favoritas = rng.choices(categorias, popularidad, k=2)
+
+        puntos_totales = 0
+        for i in range(n_habits):
+            item = rng.choice(por_categoria[favoritas[0] if rng.random() < 0.6 else rng.choice(favoritas)])
+            dias = rng.choices(patterns, pattern_weights)[0]
+            if i < len(dates):
+                fecha, estado = dates[i], 'completado'
+                puntos_totales += item['puntos']
+            else:
+                fecha, estado = joined + timedelta(days=rng.randint(0, (end - joined).days)), 'pendiente'
+            rows['habitos'].append((
+                id_habito, item['nombre'], item['puntos'], fecha, item['categoria'], dias, masks[dias], estado, id_usuario,
+            ))
+            rows['usuario_habito'].append((id_usuario, id_habito))
+            id_habito += 1
+
+        rows['usuarios'].append((id_usuario, username, email, password, creado, last_login))
+        rows['perfiles'].append((
+            id_usuario, puntos_totales, racha_actual, racha_maxima, n_habits, len(dates), 0, rng.choice((1, 3, 3, 5)),
+        ))
+        rows['preferencias'].append((
+            id_usuario, rng.random() < 0.4, rng.random() < 0.5, rng.random() < 0.2,
+            rng.choice(ZONAS), 'es' if rng.random() < 0.85 else 'en',
+        ))
+        datos = json.dumps({'id_usuario': id_usuario, 'username': username, 'email': email})
+        rows['usuario_logs'].append((id_usuario, 'INSERT', creado, datos))
+        for _ in range(min(options['max_logs'], int(activity * 2))):
+            rows['usuario_logs'].append((
+                id_usuario, 'UPDATE', creado + timedelta(seconds=rng.randint(0, (end - joined).days * 86400 + 1)), datos,
+            ))
+    return rows
+
+
+def load_chunk(alias, seed, index, first_user, first_habit, users, options, password):
+    """Generates one chunk and loads it in its own transaction; returns rows per table."""
+    rows = generate_chunk(seed, index, first_user, first_habit, users, options, password)
+    connection = connections[alias]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for table in TABLE_ORDER:
+            if rows[table]:
+                load_rows(connection, cursor, table, COLUMNS[table], rows[table])
+    return {table: len(table_rows) for table, table_rows in rows.items()}
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users, profiles, habits, links and logs at scale on a local database: '
+        'power-law activity, streaks consistent with reconcile_profiles and habits from the base.pl '
+        'catalog, streamed with COPY FROM STDIN in parallel chunks (multi-row INSERT on SQLite).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365, help='History length')
+        parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(), help='Last day of history (YYYY-MM-DD)')
+        parser.add_argument('--alpha', type=float, default=1.5, help='Pareto exponent of user activity')
+        parser.add_argument('--max-habits', type=int, default=200)
+        parser.add_argument('--max-logs', type=int, default=50)
+        parser.add_argument('--inactive', type=float, default=0.15, help='Share of users without habits')
+        parser.add_argument('--prefix', default='gen_')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        if connection.vendor != 'sqlite' and connection.settings_dict.get('HOST') not in LOCAL_HOSTS:
+            raise CommandError('Refusing to generate data on non-local database host {}'.format(connection.settings_dict.get('HOST')))
+
+        seed = options['seed']
+        rng = random.Random(seed)
+        password = make_password(PASSWORD)
+        next_user = (Usuario.objects.using(alias).aggregate(m=Max('id_usuario'))['m'] or 0) + 1
+        next_habit = (Habito.objects.using(alias).aggregate(m=Max('id_habito'))['m'] or 0) + 1
+        chunk_options = {key: options[key] for key in ('days', 'end_date', 'max_logs', 'prefix')}
+
+        def chunks():
+            nonlocal next_user, next_habit
+            remaining, index = options['users'], 0
+            while remaining > 0:
+                size = min(options['chunk_size'], remaining)
+                users = []
+                for _ in range(size):
+                    activity = rng.paretovariate(options['alpha'])
+                    inactive = rng.random() < options['inactive']
+                    users.append((activity, 0 if inactive else min(options['max_habits'], int(activity * 3))))
+                yield (alias, seed, index, next_user, next_habit, users, chunk_options, password)
+                next_user += size
+                next_habit += sum(n for _, n in users)
+                remaining -= size
+                index += 1
+
+        totals = dict.fromkeys(TABLE_ORDER, 0)
+        started = time.perf_counter()
+
+        def report(counts):
+            for table, n in counts.items():
+                totals[table] += n
+            elapsed = time.perf_counter() - started
+            self.stdout.write('{}/{} users, {} rows ({:.0f} rows/s)'.format(
+                totals['usuarios'], options['users'], sum(totals.values()), sum(totals.values()) / elapsed
+            ))
+
+        if connection.vendor == 'sqlite' or options['workers'] <= 1:
+            # SQLite has a single writer; parallel chunks would only wait on the lock
+            for task in chunks():
+                report(load_chunk(*task))
+        else:
+            # Fresh processes open their own connections (nothing inherited from this one)
+            connections.close_all()
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(options['workers'], mp_context=context, initializer=_init_worker) as executor:
+                pending = set()
+                for task in chunks():
+                    if len(pending) >= options['workers'] * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            report(future.result())
+                    pending.add(executor.submit(load_chunk, *task))
+                for future in wait(pending).done:
+                    report(future.result())
+
+        if connection.vendor == 'postgresql':
+            # Rows were copied with explicit ids; move the sequences past them
+            with connection.cursor() as cursor:
+                for table, column in (('usuarios', 'id_usuario'), ('habitos', 'id_habito'), ('usuario_logs', 'id_log')):
+                    cursor.execute(
+                        'SELECT setval(pg_get_serial_sequence(%s, %s), (SELECT MAX({}) FROM {})) '
+                        'WHERE pg_get_serial_sequence(%s, %s) IS NOT NULL'.format(column, table),
+                        [table, column, table, column],
+                    )
+                for table in TABLE_ORDER:
+                    cursor.execute('ANALYZE {}'.format(table))
+
+        self.stdout.write(self.style.SUCCESS('Generated {} in {:.1f}s (password "{}")'.format(
+            ', '.join('{} {}'.format(n, table) for table, n in totals.items()), time.perf_counter() - started, PASSWORD,
+        )))
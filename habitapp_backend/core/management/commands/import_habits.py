@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import FORMATS, HabitImport, ImportRejected, import_format
+from core.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a user's habit history from a CSV or NDJSON file (or stdin with -), validated in batches "
+        'and loaded with COPY or multi-row INSERT in one transaction; profile counters are recomputed at the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or NDJSON file, - for stdin')
+        parser.add_argument('--user', required=True, help='username or id_usuario')
+        parser.add_argument('--format', choices=sorted(FORMATS), help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, help='Rows per batch (default IMPORT_BATCH_SIZE)')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows and report the rest')
+
+    def handle(self, *args, **options):
+        lookup = {'id_usuario': options['user']} if options['user'].isdigit() else {'username': options['user']}
+        usuario = Usuario.objects.filter(**lookup).first()
+        if usuario is None:
+            raise CommandError('Unknown user {}'.format(options['user']))
+        fmt = import_format(options['format'], name=options['file'])
+        if fmt is None:
+            raise CommandError('Cannot tell the format of {}, use --format'.format(options['file']))
+
+        def progress(imported, invalid, line):
+            self.stdout.write('{} rows imported, {} invalid (line {})'.format(imported, invalid, line))
+
+        importer = HabitImport(
+            usuario.id_usuario, batch_size=options['batch_size'], skip_invalid=options['skip_invalid'], progress=progress,
+        )
+        try:
+            if options['file'] == '-':
+                summary = importer.run(sys.stdin.buffer, fmt)
+            else:
+                with open(options['file'], 'rb') as f:
+                    summary = importer.run(f, fmt)
+        except OSError as e:
+            raise CommandError(str(e))
+        except ImportRejected as e:
+            for error in e.errors:
+                self.stderr.write('line {linea}: {error}'.format(**error))
+            raise CommandError('Nothing imported: {} invalid rows'.format(e.invalid))
+
+        for error in summary['errores']:
+            self.stderr.write('line {linea}: {error}'.format(**error))
+        self.stdout.write(self.style.SUCCESS('Imported {} habits for {} in {:.1f}s ({} invalid skipped, {} achievements)'.format(
+            summary['importados'], usuario.username, summary['segundos'], summary['invalidos'], summary['logros_nuevos'],
+        )))
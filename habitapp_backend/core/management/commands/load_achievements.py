@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Logro
+
+# Same catalogue as src/utils/achievementDefinitions.ts: (nombre, condicion, puntos)
+ACHIEVEMENTS = [
+    ('Primera Semana', 'racha_7', 50),
+    ('Mes Imparable', 'racha_30', 200),
+    ('Leyenda', 'racha_100', 1000),
+    ('Coleccionista', 'habits_5', 100),
+    ('Maestro de Hábitos', 'habits_10', 250),
+    ('Experto', 'habits_20', 500),
+    ('Primeros Pasos', 'completed_10', 30),
+    ('Consistencia', 'completed_50', 150),
+    ('Imparable', 'completed_100', 300),
+    ('Campeón', 'completed_500', 1500),
+    ('Novato', 'points_100', 20),
+    ('Competidor', 'points_1000', 200),
+    ('Maestro', 'points_5000', 1000),
+    ('Leyenda de Puntos', 'points_10000', 2500),
+    ('Madrugador', 'early_bird_10', 150),
+    ('Fin de Semana Activo', 'weekend_warrior', 100),
+    ('Perfección', 'perfect_week', 500),
+]
+
+
+class Command(BaseCommand):
+    help = 'Create or update the achievement catalogue in the logros table.'
+
+    def handle(self, *args, **options):
+        existing = {l.nombre: l for l in Logro.objects.filter(nombre__in=[a[0] for a in ACHIEVEMENTS])}
+        created = updated = 0
+        for nombre, condicion, puntos in ACHIEVEMENTS:
+            logro = existing.get(nombre)
+            if logro is None:
+                Logro.objects.create(nombre=nombre, condicion=condicion, puntos=puntos)
+                created += 1
+            elif (logro.condicion, logro.puntos) != (condicion, puntos):
+                logro.condicion, logro.puntos = condicion, puntos
+                logro.save()
+                updated += 1
+        self.stdout.write(self.style.SUCCESS('Achievements: {} created, {} updated'.format(created, updated)))
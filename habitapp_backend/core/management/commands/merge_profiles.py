@@ -0,0 +1,60 @@
+import os
+import pstats
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge the request profiles in PROFILE_DIR into one file per view: '
+        '<view>.collapsed (input for flamegraph.pl or speedscope) and <view>.prof (pstats).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILE_DIR, help='Directory with the request profiles')
+        parser.add_argument('--output', help='Where to write the merged files (default: <dir>/merged)')
+        parser.add_argument('--view', help='Only merge profiles whose view name contains this text')
+        parser.add_argument('--delete', action='store_true', help='Delete the request profiles once merged')
+
+    def handle(self, *args, **options):
+        source = options['dir']
+        if not os.path.isdir(source):
+            raise CommandError('No profile directory at {}'.format(source))
+        output = options['output'] or os.path.join(source, 'merged')
+        os.makedirs(output, exist_ok=True)
+
+        # <view>.<time>.<pid>.<n>.<ext>, see core/profiling.py
+        groups = defaultdict(list)
+        for name in sorted(os.listdir(source)):
+            parts = name.split('.')
+            if len(parts) != 5 or parts[-1] not in ('collapsed', 'prof'):
+                continue
+            if options['view'] and options['view'] not in parts[0]:
+                continue
+            groups[(parts[0], parts[-1])].append(os.path.join(source, name))
+
+        for (view, extension), paths in sorted(groups.items()):
+            target = os.path.join(output, '{}.{}'.format(view, extension))
+            if extension == 'collapsed':
+                stacks = Counter()
+                for path in paths:
+                    with open(path) as f:
+                        for line in f:
+                            stack, _, count = line.rstrip('\n').rpartition(' ')
+                            if stack:
+                                stacks[stack] += int(count)
+                with open(target, 'w') as f:
+                    for stack, count in stacks.most_common():
+                        f.write('{} {}\n'.format(stack, count))
+            else:
+                stats = pstats.Stats(*paths)
+                stats.dump_stats(target)
+            self.stdout.write('{}: {} profiles -> {}'.format(view, len(paths), target))
+            if options['delete']:
+                for path in paths:
+                    os.remove(path)
+
+        if not groups:
+            self.stdout.write('No profiles to merge')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.revocation import revocation_list
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete tokens_revocados rows whose tokens have expired. Run periodically (e.g. hourly from cron); '
+        'the request workers only read the table.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = revocation_list.prune()
+        self.stdout.write(self.style.SUCCESS('Deleted {} expired revocations'.format(deleted)))
@@ -0,0 +1,85 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.reconcile import DAY_NUMBER, FIELDS, apply_fixes, compute_drift
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Perfil counters from habitos and usuario_logro in user-id chunks, '
+        'report per-field drift and optionally fix it with batched UPDATEs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the recomputed values')
+        parser.add_argument('--fields', default=','.join(FIELDS), help='Comma separated subset of ' + ', '.join(FIELDS))
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--statement-timeout', type=int, default=30000, help='Milliseconds per statement (Postgres)')
+        parser.add_argument('--checkpoint', help='File recording the last finished id_usuario')
+        parser.add_argument('--resume', action='store_true', help='Start after the id stored in --checkpoint')
+
+    def handle(self, *args, **options):
+        fields = [f.strip() for f in options['fields'].split(',') if f.strip()]
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise CommandError('Unknown fields: {}'.format(', '.join(sorted(unknown))))
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume needs --checkpoint')
+        if connection.vendor not in DAY_NUMBER and ('racha_actual' in fields or 'racha_maxima' in fields):
+            raise CommandError('Streak reconciliation is not supported on {}'.format(connection.vendor))
+
+        last_id = 0
+        if options['resume'] and os.path.exists(options['checkpoint']):
+            with open(options['checkpoint']) as f:
+                last_id = json.load(f)['last_id_usuario']
+            self.stdout.write('Resuming after id_usuario {}'.format(last_id))
+
+        report = {f: {'rows': 0, 'total': 0, 'max': 0} for f in fields}
+        checked = fixed = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT id_usuario FROM perfiles WHERE id_usuario > %s ORDER BY id_usuario LIMIT %s',
+                    [last_id, options['chunk_size']],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            low, high = ids[0], ids[-1]
+
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        # SET takes no bind parameters
+                        cursor.execute('SET LOCAL statement_timeout = {:d}'.format(options['statement_timeout']))
+                drift = compute_drift(low, high, fields)
+                for id_usuario, values in drift.items():
+                    for field, (current, expected) in values.items():
+                        delta = abs(expected - current)
+                        report[field]['rows'] += 1
+                        report[field]['total'] += delta
+                        report[field]['max'] = max(report[field]['max'], delta)
+                        if options['verbosity'] >= 2:
+                            self.stdout.write('  id_usuario={} {}: {} -> {}'.format(id_usuario, field, current, expected))
+                if options['fix'] and drift:
+                    fixed += apply_fixes(drift)
+
+            checked += len(ids)
+            last_id = high
+            if options['checkpoint']:
+                with open(options['checkpoint'], 'w') as f:
+                    json.dump({'last_id_usuario': last_id}, f)
+            self.stdout.write('Checked {} profiles (up to id_usuario {})'.format(checked, last_id))
+
+        self.stdout.write('')
+        self.stdout.write('{:<22} {:>10} {:>14} {:>10}'.format('field', 'drifted', 'total |drift|', 'max'))
+        for field in fields:
+            r = report[field]
+            self.stdout.write('{:<22} {:>10} {:>14} {:>10}'.format(field, r['rows'], r['total'], r['max']))
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS('Fixed {} profiles'.format(fixed)))
+        else:
+            self.stdout.write('Dry run, use --fix to write the recomputed values')
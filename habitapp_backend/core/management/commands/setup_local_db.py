@@ -0,0 +1,63 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import (
+    Usuario, Perfil, Preferencia, Habito, Logro, UsuarioLog
+)
+
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+
+# The link tables use a composite primary key that Django cannot express, so they
+# are created with portable SQL instead of the schema editor.
+LINK_TABLES_SQL = {
+    'usuario_habito': """
+        CREATE TABLE usuario_habito (
+            id_usuario integer NOT NULL REFERENCES usuarios (id_usuario) ON DELETE CASCADE,
+            id_habito integer NOT NULL REFERENCES habitos (id_habito) ON DELETE CASCADE,
+            PRIMARY KEY (id_usuario, id_habito)
+        )
+    """,
+    'usuario_logro': """
+        CREATE TABLE usuario_logro (
+            id_usuario integer NOT NULL REFERENCES usuarios (id_usuario) ON DELETE CASCADE,
+            id_logro integer NOT NULL REFERENCES logros (id_logro) ON DELETE CASCADE,
+            fecha_obtencion timestamp with time zone NOT NULL,
+            PRIMARY KEY (id_usuario, id_logro)
+        )
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = 'Create the HabitMaster schema on a local database (SQLite or local Postgres) for tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        settings_dict = connection.settings_dict
+
+        if connection.vendor != 'sqlite' and settings_dict.get('HOST') not in LOCAL_HOSTS:
+            raise CommandError('Refusing to create tables on non-local database host {}'.format(settings_dict.get('HOST')))
+
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.table_names(cursor))
+
+        # Parents before children so foreign keys resolve
+        models = [Usuario, Perfil, Preferencia, Habito, Logro, UsuarioLog]
+        with connection.schema_editor() as editor:
+            for model in models:
+                if model._meta.db_table not in existing:
+                    editor.create_model(model)
+                    self.stdout.write('Created {}'.format(model._meta.db_table))
+            for table, sql in LINK_TABLES_SQL.items():
+                if table not in existing:
+                    editor.execute(sql)
+                    self.stdout.write('Created {}'.format(table))
+
+        # Django's own tables plus the core migrations (which alter the tables above)
+        call_command('migrate', database=alias, verbosity=0)
+        self.stdout.write(self.style.SUCCESS('Local schema ready on "{}"'.format(alias)))
@@ -0,0 +1,94 @@
+"""
+Prometheus metrics, served at /metrics.
+
+With several server workers set PROMETHEUS_MULTIPROC_DIR to an empty directory
+shared by them (wiped on deploy): every process then writes its samples to its
+own mmap files and /metrics aggregates them, whichever worker answers. Gunicorn
+should also call prometheus_client.multiprocess.mark_process_dead(worker.pid)
+from its child_exit hook so live gauges drop dead workers.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+from .db_pool import pool_stats
+
+REQUEST_SECONDS = Histogram(
+    'habitapp_request_duration_seconds', 'Request latency by route', ['route', 'method', 'status'],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'habitapp_requests_in_flight', 'Requests being served', multiprocess_mode='livesum',
+)
+DB_POOL = Gauge(
+    'habitapp_db_pool', 'psycopg pool statistics (core/db_pool.py)', ['alias', 'stat'], multiprocess_mode='livesum',
+)
+PROLOG_SECONDS = Histogram(
+    'habitapp_prolog_query_duration_seconds', 'Prolog query latency', ['predicate'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, float('inf')),
+)
+CHAT_SECONDS = Histogram(
+    'habitapp_chat_upstream_duration_seconds', 'Chat completion latency', ['outcome'],
+    buckets=(.25, .5, 1, 2, 4, 8, 15, 30, 60, float('inf')),
+)
+CHAT_TOKENS = Counter(
+    'habitapp_chat_tokens', 'Chat completion tokens', ['kind'],
+)
+CACHE_LOOKUPS = Counter(
+    'habitapp_cache_lookups', 'Cache lookups by cache and result', ['cache', 'result'],
+)
+
+_pool_updated_at = 0.0
+
+
+def cache_lookup(name, value):
+    """Counts a hit or miss for `name` and returns value unchanged."""
+    CACHE_LOOKUPS.labels(name, 'miss' if value is None else 'hit').inc()
+    return value
+
+
+def update_pool_gauges():
+    # Each worker publishes its own pool, at most every METRICS_POOL_INTERVAL seconds
+    global _pool_updated_at
+    now = time.monotonic()
+    if now - _pool_updated_at < settings.METRICS_POOL_INTERVAL:
+        return
+    _pool_updated_at = now
+    for alias, stats in pool_stats().items():
+        for stat, value in stats.items():
+            DB_POOL.labels(alias, stat).set(value)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == '/metrics':
+            return self.get_response(request)
+        start = time.perf_counter()
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        # view_name keeps the label set small; unknown URLs share one series
+        route = (match.view_name or match.route) if match else 'unmatched'
+        REQUEST_SECONDS.labels(route, request.method, response.status_code).observe(time.perf_counter() - start)
+        update_pool_gauges()
+        return response
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != 'Bearer {}'.format(token):
+        return HttpResponseForbidden()
+    update_pool_gauges()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# The core tables are not managed by Django, so the schema change is applied with
+# plain SQL. Each step checks the live schema first, which keeps the migration
+# safe to run against Neon and against a local stand-in created by setup_local_db.
+
+INDEX_NAME = 'habitos_usr_fecha_estado_idx'
+
+SYNC_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION sync_habito_usuario() RETURNS trigger AS $$
+BEGIN
+    UPDATE habitos SET id_usuario = NEW.id_usuario
+    WHERE id_habito = NEW.id_habito AND id_usuario IS DISTINCT FROM NEW.id_usuario;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SYNC_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_sync_habito_usuario ON usuario_habito;
+CREATE TRIGGER trg_sync_habito_usuario
+AFTER INSERT OR UPDATE ON usuario_habito
+FOR EACH ROW EXECUTE FUNCTION sync_habito_usuario();
+"""
+
+
+def add_owner_column(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if 'habitos' not in tables:
+            return
+        columns = [c.name for c in connection.introspection.get_table_description(cursor, 'habitos')]
+        constraints = connection.introspection.get_constraints(cursor, 'habitos')
+
+    if 'id_usuario' not in columns:
+        schema_editor.execute(
+            'ALTER TABLE habitos ADD COLUMN id_usuario integer NULL '
+            'REFERENCES usuarios (id_usuario) ON DELETE CASCADE'
+        )
+    if 'usuario_habito' in tables:
+        schema_editor.execute(
+            'UPDATE habitos SET id_usuario = ('
+            '    SELECT uh.id_usuario FROM usuario_habito uh WHERE uh.id_habito = habitos.id_habito'
+            ') WHERE id_usuario IS NULL'
+        )
+    if INDEX_NAME not in constraints:
+        schema_editor.execute(
+            'CREATE INDEX {} ON habitos (id_usuario, fecha, estado)'.format(INDEX_NAME)
+        )
+    if connection.vendor == 'postgresql' and 'usuario_habito' in tables:
+        # Links created outside the API (SQL console, other services) keep the owner in sync.
+        schema_editor.execute(SYNC_FUNCTION_SQL)
+        schema_editor.execute(SYNC_TRIGGER_SQL)
+
+
+def remove_owner_column(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TRIGGER IF EXISTS trg_sync_habito_usuario ON usuario_habito')
+        schema_editor.execute('DROP FUNCTION IF EXISTS sync_habito_usuario()')
+    schema_editor.execute('DROP INDEX IF EXISTS {}'.format(INDEX_NAME))
+    schema_editor.execute('ALTER TABLE habitos DROP COLUMN id_usuario')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_owner_column, remove_owner_column),
+    ]
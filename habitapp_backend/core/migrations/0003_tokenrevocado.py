@@ -0,0 +1,24 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_habito_usuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocado',
+            fields=[
+                ('jti', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('id_usuario', models.IntegerField()),
+                ('fecha_revocacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_expiracion', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'tokens_revocados',
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+from core.dias import dias_to_mask
+
+# Same approach as 0002: plain SQL guarded by checks on the live schema.
+
+INDEX_NAME = 'habitos_usr_dias_mask_idx'
+
+# SQL twin of core.dias.dias_to_mask, used for the backfill and by the trigger
+MASK_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION habito_dias_mask(dias text) RETURNS smallint AS $$
+    SELECT COALESCE(bit_or(
+        CASE left(translate(lower(btrim(d)), 'áéíóú', 'aeiou'), 3)
+            WHEN 'lun' THEN 1 WHEN 'mon' THEN 1
+            WHEN 'mar' THEN 2 WHEN 'tue' THEN 2
+            WHEN 'mie' THEN 4 WHEN 'wed' THEN 4
+            WHEN 'jue' THEN 8 WHEN 'thu' THEN 8
+            WHEN 'vie' THEN 16 WHEN 'fri' THEN 16
+            WHEN 'sab' THEN 32 WHEN 'sat' THEN 32
+            WHEN 'dom' THEN 64 WHEN 'sun' THEN 64
+        END
+    ), 127)::smallint
+    FROM unnest(string_to_array(dias, ',')) AS d;
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+SYNC_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION sync_habito_dias_mask() RETURNS trigger AS $$
+BEGIN
+    NEW.dias_mask := habito_dias_mask(NEW.dias);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SYNC_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_sync_habito_dias_mask ON habitos;
+CREATE TRIGGER trg_sync_habito_dias_mask
+BEFORE INSERT OR UPDATE OF dias ON habitos
+FOR EACH ROW EXECUTE FUNCTION sync_habito_dias_mask();
+"""
+
+
+def add_dias_mask(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'habitos' not in connection.introspection.table_names(cursor):
+            return
+        columns = [c.name for c in connection.introspection.get_table_description(cursor, 'habitos')]
+        constraints = connection.introspection.get_constraints(cursor, 'habitos')
+
+    if 'dias_mask' not in columns:
+        schema_editor.execute('ALTER TABLE habitos ADD COLUMN dias_mask smallint NOT NULL DEFAULT 127')
+        if connection.vendor == 'postgresql':
+            schema_editor.execute(MASK_FUNCTION_SQL)
+            schema_editor.execute('UPDATE habitos SET dias_mask = habito_dias_mask(dias)')
+        else:
+            # Few distinct strings in practice, so one UPDATE per distinct value
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT DISTINCT dias FROM habitos WHERE dias IS NOT NULL')
+                values = [row[0] for row in cursor.fetchall()]
+                for dias in values:
+                    cursor.execute('UPDATE habitos SET dias_mask = %s WHERE dias = %s', [dias_to_mask(dias), dias])
+    if INDEX_NAME not in constraints:
+        schema_editor.execute('CREATE INDEX {} ON habitos (id_usuario, dias_mask)'.format(INDEX_NAME))
+    if connection.vendor == 'postgresql':
+        # Habits written outside the API (SQL console, other services) keep the mask in sync.
+        schema_editor.execute(MASK_FUNCTION_SQL)
+        schema_editor.execute(SYNC_FUNCTION_SQL)
+        schema_editor.execute(SYNC_TRIGGER_SQL)
+
+
+def remove_dias_mask(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TRIGGER IF EXISTS trg_sync_habito_dias_mask ON habitos')
+        schema_editor.execute('DROP FUNCTION IF EXISTS sync_habito_dias_mask()')
+        schema_editor.execute('DROP FUNCTION IF EXISTS habito_dias_mask(text)')
+    schema_editor.execute('DROP INDEX IF EXISTS {}'.format(INDEX_NAME))
+    schema_editor.execute('ALTER TABLE habitos DROP COLUMN dias_mask')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_tokenrevocado'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_dias_mask, remove_dias_mask),
+    ]
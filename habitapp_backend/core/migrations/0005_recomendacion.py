@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_habito_dias_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recomendacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_usuario', models.IntegerField()),
+                ('posicion', models.SmallIntegerField()),
+                ('nombre', models.CharField(max_length=100)),
+                ('categoria', models.CharField(max_length=100)),
+                ('dificultad', models.CharField(max_length=20)),
+                ('puntos', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'recomendaciones',
+                'constraints': [models.UniqueConstraint(fields=('id_usuario', 'posicion'), name='recomendaciones_usr_pos_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:43
+
+from django.db import migrations, models
+
+TRGM_INDEX = 'nombres_habito_trgm_idx'
+PREFIX_INDEX = 'nombres_habito_prefix_idx'
+
+
+def add_search_indexes(apps, schema_editor):
+    # Trigram matching is Postgres only; SQLite stand-ins use the in-process trie (core/autocomplete.py)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS {} ON nombres_habito USING gin (nombre_normalizado gin_trgm_ops)'.format(TRGM_INDEX)
+    )
+    # LIKE 'q%' for queries shorter than a trigram, independent of the database collation
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS {} ON nombres_habito (nombre_normalizado text_pattern_ops)'.format(PREFIX_INDEX)
+    )
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS {}'.format(TRGM_INDEX))
+    schema_editor.execute('DROP INDEX IF EXISTS {}'.format(PREFIX_INDEX))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recomendacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NombreHabito',
+            fields=[
+                ('nombre_normalizado', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100)),
+                ('popularidad', models.IntegerField(default=0)),
+                ('en_catalogo', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'nombres_habito',
+            },
+        ),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+from core.dias import dias_to_mask
+
+# 0004 mirrored the frontend's frequency encoding ("Mon,Mon,Mon") as Monday only.
+# Redefine the SQL twin of core.dias.dias_to_mask (also used by the trigger) and
+# backfill again with the corrected rule.
+
+MASK_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION habito_dias_mask(dias text) RETURNS smallint AS $$
+    SELECT CASE
+        WHEN bool_and(lower(token) = 'mon') OR count(bit) > count(DISTINCT bit) THEN 127
+        ELSE COALESCE(bit_or(bit), 127)
+    END::smallint
+    FROM (
+        SELECT btrim(d) AS token,
+               CASE left(translate(lower(btrim(d)), 'áéíóú', 'aeiou'), 3)
+                   WHEN 'lun' THEN 1 WHEN 'mon' THEN 1
+                   WHEN 'mar' THEN 2 WHEN 'tue' THEN 2
+                   WHEN 'mie' THEN 4 WHEN 'wed' THEN 4
+                   WHEN 'jue' THEN 8 WHEN 'thu' THEN 8
+                   WHEN 'vie' THEN 16 WHEN 'fri' THEN 16
+                   WHEN 'sab' THEN 32 WHEN 'sat' THEN 32
+                   WHEN 'dom' THEN 64 WHEN 'sun' THEN 64
+               END AS bit
+        FROM unnest(string_to_array(dias, ',')) AS d
+        WHERE btrim(d) <> ''
+    ) tokens;
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+
+def recompute_dias_mask(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'habitos' not in connection.introspection.table_names(cursor):
+            return
+        columns = [c.name for c in connection.introspection.get_table_description(cursor, 'habitos')]
+    if 'dias_mask' not in columns:
+        return
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(MASK_FUNCTION_SQL)
+        schema_editor.execute(
+            'UPDATE habitos SET dias_mask = habito_dias_mask(dias) WHERE dias_mask IS DISTINCT FROM habito_dias_mask(dias)'
+        )
+        return
+    # Few distinct strings in practice, so one UPDATE per distinct value
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT DISTINCT dias FROM habitos WHERE dias IS NOT NULL')
+        values = [row[0] for row in cursor.fetchall()]
+        for dias in values:
+            cursor.execute(
+                'UPDATE habitos SET dias_mask = %s WHERE dias = %s AND dias_mask <> %s',
+                [dias_to_mask(dias), dias, dias_to_mask(dias)],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_nombrehabito'),
+    ]
+
+    operations = [
+        # The old rule is the bug being fixed; nothing to restore on the way back
+        migrations.RunPython(recompute_dias_mask, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from .dias import ALL_DAYS, dias_to_mask
 
 class UsuarioManager(BaseUserManager):
     def create_user(self, username, email, password=None):
@@ -64,6 +65,15 @@ class Perfil(models.Model):
         db_table = 'perfiles'
         managed = False
 
+    COUNTER_FIELDS = ('puntos_totales', 'racha_maxima', 'num_habitos_creados', 'habitos_completados')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot of the counters as loaded, so post_save can tell which achievement thresholds were crossed
+        instance._loaded_counters = {f: getattr(instance, f) for f in cls.COUNTER_FIELDS if f in field_names}
+        return instance
+
 class Preferencia(models.Model):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True, db_column='id_usuario')
     modo_oscuro = models.BooleanField(default=False)
@@ -84,15 +94,33 @@ class Habito(models.Model):
     fecha = models.DateField(default=timezone.now)
     categoria = models.CharField(max_length=100, null=True, blank=True)
     dias = models.CharField(max_length=50, null=True, blank=True)
+    # Days named in dias as a bit mask (core/dias.py), kept in sync on save
+    dias_mask = models.SmallIntegerField(default=ALL_DAYS)
     estado = models.CharField(max_length=20, default='pendiente')
+    # Denormalized owner, mirrors usuario_habito so the habit list and streak
+    # lookups can be answered from habitos_usr_fecha_estado_idx without a join.
+    # The composite index leads with this column, so no separate FK index is needed.
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, db_column='id_usuario', null=True, blank=True, db_index=False)
 
     class Meta:
         db_table = 'habitos'
         managed = False
+        indexes = [
+            models.Index(fields=['usuario', 'fecha', 'estado'], name='habitos_usr_fecha_estado_idx'),
+            # "Due today" scans the user's entries and tests the day bit on the index
+            models.Index(fields=['usuario', 'dias_mask'], name='habitos_usr_dias_mask_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        self.dias_mask = dias_to_mask(self.dias)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'dias' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'dias_mask'}
+        super().save(*args, **kwargs)
+
 class UsuarioHabito(models.Model):
     # Django requires a single primary key. We'll use usuario as the PK for definition purposes,
     # but in reality it's a composite key.
@@ -139,3 +167,45 @@ class UsuarioLog(models.Model):
     class Meta:
         db_table = 'usuario_logs'
         managed = False
+
+class TokenRevocado(models.Model):
+    # Created by Django (managed), unlike the tables above.
+    # jti is either a token's jti or 'usuario:<id>' for "every token of this user issued before fecha_revocacion".
+    jti = models.CharField(max_length=255, primary_key=True)
+    id_usuario = models.IntegerField()
+    fecha_revocacion = models.DateTimeField(default=timezone.now)
+    fecha_expiracion = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'tokens_revocados'
+
+class Recomendacion(models.Model):
+    # Managed, like TokenRevocado. Rewritten nightly by `build_recommendations`;
+    # serving a user's list is one read on the (id_usuario, posicion) unique index.
+    id_usuario = models.IntegerField()
+    posicion = models.SmallIntegerField()
+    nombre = models.CharField(max_length=100)
+    categoria = models.CharField(max_length=100)
+    dificultad = models.CharField(max_length=20)
+    puntos = models.IntegerField()
+    score = models.FloatField()
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'recomendaciones'
+        constraints = [
+            models.UniqueConstraint(fields=['id_usuario', 'posicion'], name='recomendaciones_usr_pos_uniq'),
+        ]
+
+class NombreHabito(models.Model):
+    # Managed. Suggestion source for /api/habitos/autocomplete/, rebuilt by
+    # `build_autocomplete` from the catalog (base.pl) and the names in habitos.
+    # nombre_normalizado is core.text.fold(nombre); on Postgres it carries a
+    # pg_trgm GIN index and a text_pattern_ops index (migration 0006).
+    nombre_normalizado = models.CharField(max_length=100, primary_key=True)
+    nombre = models.CharField(max_length=100)
+    popularidad = models.IntegerField(default=0)
+    en_catalogo = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'nombres_habito'
@@ -0,0 +1,112 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware profiles a request when random() < PROFILE_SAMPLE_RATE, or
+when it carries `X-Profile: <PROFILE_TOKEN>` (the header is ignored while
+PROFILE_TOKEN is empty). Two profilers are available through PROFILE_MODE:
+
+- 'sampling': a helper thread records the request thread's stack every
+  PROFILE_INTERVAL_MS and writes collapsed stacks (`a;b;c count`), cheap
+  enough to leave on at a low sample rate;
+- 'cprofile': deterministic cProfile, written as pstats.
+
+Files go to PROFILE_DIR as <view>.<time>.<pid>.<n>.collapsed|.prof;
+`manage.py merge_profiles` folds them into one flame-graph-ready file per view.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+_sequence = itertools.count()
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{}:{}:{}'.format(
+                    os.path.basename(code.co_filename), code.co_name, code.co_firstlineno
+                ))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write('{} {}\n'.format(stack, count))
+
+
+def should_profile(request):
+    token = settings.PROFILE_TOKEN
+    if token and hmac.compare_digest(request.headers.get('X-Profile', ''), token):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def profile_path(request, extension):
+    match = getattr(request, 'resolver_match', None)
+    view = (match.view_name or match.route) if match else 'unmatched'
+    view = re.sub(r'[^A-Za-z0-9_-]+', '_', '{}_{}'.format(request.method, view))
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = '{}.{}.{}.{}.{}'.format(view, int(time.time()), os.getpid(), next(_sequence), extension)
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        if settings.PROFILE_MODE == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            path = profile_path(request, 'prof')
+            profiler.dump_stats(path)
+        else:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000)
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            path = profile_path(request, 'collapsed')
+            sampler.write(path)
+
+        response['X-Profile-File'] = os.path.basename(path)
+        return response
@@ -8,6 +8,9 @@ except Exception as e:
     print(f"WARNING: Error importing pyswip: {e}. Check SWI-Prolog installation.")
 
 import os
+import time
+
+from .metrics import PROLOG_SECONDS
 
 class PrologService:
     def __init__(self):
@@ -31,6 +34,14 @@ class PrologService:
         else:
             print("Prolog service disabled due to missing dependencies.")
 
+    def _query(self, predicate, query):
+        # Solutions are collected here so the histogram covers the whole resolution
+        start = time.perf_counter()
+        try:
+            return list(self.prolog.query(query))
+        finally:
+            PROLOG_SECONDS.labels(predicate).observe(time.perf_counter() - start)
+
     def obtener_sugerencias(self, categoria):
         """
         Consulta a Prolog para obtener sugerencias de hábitos dada una categoría.
@@ -41,7 +52,7 @@ class PrologService:
         sugerencias = []
         try:
             query = f"sugerir_habito('{categoria}', Habito)"
-            for soln in self.prolog.query(query):
+            for soln in self._query('sugerir_habito', query):
                 sugerencias.append(soln["Habito"])
         except Exception as e:
             print(f"Error querying Prolog: {e}")
@@ -57,7 +68,7 @@ class PrologService:
         sugerencias = []
         try:
             query = f"sugerir_por_dificultad('{dificultad}', Habito)"
-            for soln in self.prolog.query(query):
+            for soln in self._query('sugerir_por_dificultad', query):
                 sugerencias.append(soln["Habito"])
         except Exception as e:
             print(f"Error querying Prolog: {e}")
@@ -72,8 +83,8 @@ class PrologService:
 
         try:
             query = f"es_consistente({racha})"
-            # query returns a generator, if it yields anything, it's true
-            result = list(self.prolog.query(query))
+            # If the query yields anything, it's true
+            result = self._query('es_consistente', query)
             return len(result) > 0
         except Exception as e:
             print(f"Error checking consistency: {e}")
@@ -89,7 +100,7 @@ class PrologService:
         bonus = 0
         try:
             query = f"calcular_bonus({racha}, Bonus)"
-            for soln in self.prolog.query(query):
+            for soln in self._query('calcular_bonus', query):
                 bonus = soln["Bonus"]
                 break # Take the first result
         except Exception as e:
@@ -106,7 +117,7 @@ class PrologService:
         nivel = "Desconocido"
         try:
             query = f"nivel_usuario({puntos}, Nivel)"
-            for soln in self.prolog.query(query):
+            for soln in self._query('nivel_usuario', query):
                 nivel = soln["Nivel"]
                 break
         except Exception as e:
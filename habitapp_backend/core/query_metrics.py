@@ -0,0 +1,207 @@
+"""
+Per-request SQL instrumentation.
+
+QueryMetricsMiddleware wraps every database connection with a QueryRecorder
+(connection.execute_wrapper) for the duration of the request and then:
+
+- adds a Server-Timing header (db time and query count, total time);
+- logs one JSON line on the 'core.queries' logger (INFO for every request,
+  WARNING when a budget is exceeded);
+- adds the request to `query_stats`, the in-process per-route report;
+- checks the budgets: QUERY_COUNT_LIMIT (or a view's `query_budget` attribute),
+  QUERY_SIMILAR_LIMIT (same statement repeated, the N+1 signature) and
+  QUERY_TIME_LIMIT_MS. With QUERY_LIMITS_STRICT the request raises
+  QueryBudgetExceeded, which fails the test that made it.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.queries')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(d for _, _, d in self.queries)
+
+    def similar(self):
+        """(sql, times) of the statement run most often, whatever the parameters."""
+        if not self.queries:
+            return None, 0
+        return Counter(sql for sql, _, _ in self.queries).most_common(1)[0]
+
+    def duplicates(self):
+        """Number of statements that repeated an earlier one with identical parameters."""
+        seen = Counter((sql, repr(params)) for sql, params, _ in self.queries)
+        return sum(n - 1 for n in seen.values())
+
+    def slowest(self):
+        if not self.queries:
+            return None, 0.0
+        sql, _, duration = max(self.queries, key=lambda q: q[2])
+        return sql, duration
+
+    def summary(self):
+        similar_sql, similar = self.similar()
+        slowest_sql, slowest = self.slowest()
+        return {
+            'queries': self.count,
+            'db_ms': round(self.duration * 1000, 3),
+            'duplicates': self.duplicates(),
+            'similar': similar,
+            'similar_sql': similar_sql[:300] if similar > 1 else None,
+            'slowest_ms': round(slowest * 1000, 3),
+            'slowest_sql': slowest_sql[:300] if slowest_sql else None,
+        }
+
+
+@contextmanager
+def record_queries():
+    """Records the statements run on every connection inside the block (this thread)."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def budget_violations(summary, max_queries=None, max_similar=None, max_db_ms=None):
+    violations = []
+    if max_queries is not None and summary['queries'] > max_queries:
+        violations.append('{} queries > {}'.format(summary['queries'], max_queries))
+    if max_similar is not None and summary['similar'] > max_similar:
+        violations.append('same statement run {} times > {} (N+1?): {}'.format(
+            summary['similar'], max_similar, summary['similar_sql']
+        ))
+    if max_db_ms is not None and summary['db_ms'] > max_db_ms:
+        violations.append('{} ms in the database > {} ms'.format(summary['db_ms'], max_db_ms))
+    return violations
+
+
+class QueryStats:
+    """Per-route aggregate for this process: requests, queries and time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, summary, total_ms, violations):
+        with self._lock:
+            stats = self.routes.setdefault(route, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0,
+                'total_ms': 0.0, 'max_total_ms': 0.0, 'n_plus_one': 0, 'over_budget': 0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += summary['queries']
+            stats['max_queries'] = max(stats['max_queries'], summary['queries'])
+            stats['db_ms'] += summary['db_ms']
+            stats['total_ms'] += total_ms
+            stats['max_total_ms'] = max(stats['max_total_ms'], total_ms)
+            if summary['similar'] > settings.QUERY_SIMILAR_LIMIT:
+                stats['n_plus_one'] += 1
+            if violations:
+                stats['over_budget'] += 1
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def report(self):
+        lines = ['{:<40} {:>8} {:>9} {:>9} {:>10} {:>10} {:>6} {:>6}'.format(
+            'route', 'requests', 'avg q', 'max q', 'avg db ms', 'avg ms', 'n+1', 'over'
+        )]
+        with self._lock:
+            routes = sorted(self.routes.items(), key=lambda item: -item[1]['db_ms'])
+            for route, s in routes:
+                n = s['requests']
+                lines.append('{:<40} {:>8} {:>9.1f} {:>9} {:>10.2f} {:>10.2f} {:>6} {:>6}'.format(
+                    route[:40], n, s['queries'] / n, s['max_queries'], s['db_ms'] / n,
+                    s['total_ms'] / n, s['n_plus_one'], s['over_budget'],
+                ))
+        return '\n'.join(lines)
+
+
+query_stats = QueryStats()
+
+if settings.QUERY_METRICS_REPORT_AT_EXIT:
+    atexit.register(lambda: query_stats.routes and print(query_stats.report()))
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '{} {}'.format(request.method, match.view_name or match.route)
+
+
+def view_budget(request):
+    # A view can set `query_budget = N` to override QUERY_COUNT_LIMIT
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return settings.QUERY_COUNT_LIMIT
+    view = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    return getattr(view, 'query_budget', settings.QUERY_COUNT_LIMIT)
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_METRICS:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        total_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        summary = recorder.summary()
+        route = route_name(request)
+        violations = budget_violations(
+            summary,
+            max_queries=view_budget(request),
+            max_similar=settings.QUERY_SIMILAR_LIMIT,
+            max_db_ms=settings.QUERY_TIME_LIMIT_MS,
+        )
+        query_stats.record(route, summary, total_ms, violations)
+
+        response['Server-Timing'] = 'db;desc="{} queries";dur={}, total;dur={}'.format(
+            summary['queries'], summary['db_ms'], total_ms
+        )
+        if violations:
+            line = dict(route=route, path=request.path, status=response.status_code, total_ms=total_ms, **summary)
+            line['violations'] = violations
+            logger.warning(json.dumps(line))
+            if settings.QUERY_LIMITS_STRICT:
+                raise QueryBudgetExceeded('{}: {}'.format(route, '; '.join(violations)))
+        elif logger.isEnabledFor(logging.INFO):
+            # The logger defaults to WARNING; skip building a line nobody reads
+            logger.info(json.dumps(dict(route=route, path=request.path, status=response.status_code, total_ms=total_ms, **summary)))
+        return response
@@ -0,0 +1,139 @@
+"""
+Habit recommendations scored with NumPy.
+
+The catalog is the categoria_habito/4 facts of prolog/base.pl, read directly so
+the batch does not need SWI-Prolog. Every catalog entry and every user becomes a
+vector over the same features (one per category, one per difficulty); a user's
+scores for the whole catalog are one row of U @ M.T.
+"""
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+from django.db.models import Case, Count, Q, Value, When
+
+from .models import Habito
+from .text import fold
+
+CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prolog', 'base.pl')
+FACT_RE = re.compile(
+    r"^categoria_habito\(\s*'([^']*)'\s*,\s*'([^']*)'\s*,\s*'([^']*)'\s*,\s*(\d+)\s*\)\s*\.", re.MULTILINE
+)
+
+DIFICULTADES = ('Facil', 'Medio', 'Dificil')
+
+# User habits carry points, not a difficulty; these bands match the catalog's points
+DIFICULTAD_DE_PUNTOS = Case(
+    When(puntos__lte=15, then=Value('Facil')),
+    When(puntos__lte=30, then=Value('Medio')),
+    default=Value('Dificil'),
+)
+
+# Weights of a completed and of a still pending habit in the affinity vectors
+PESO_COMPLETADO = 1.0
+PESO_PENDIENTE = 0.25
+# Difficulty match counts half as much as category match
+PESO_DIFICULTAD = 0.5
+# Share of the population-wide vector mixed into each user's (cold start)
+PESO_GLOBAL = 0.1
+
+
+@lru_cache(maxsize=1)
+def load_catalog(path=CATALOG_FILE):
+    with open(path, encoding='utf-8') as f:
+        return tuple(
+            {'categoria': c, 'nombre': n, 'dificultad': d, 'puntos': int(p)}
+            for c, n, d, p in FACT_RE.findall(f.read())
+        )
+
+
+class Recommender:
+    def __init__(self, catalog=None):
+        self.catalog = catalog or load_catalog()
+        self.categorias = sorted({item['categoria'] for item in self.catalog})
+        self.features = {c: i for i, c in enumerate(self.categorias)}
+        for d in DIFICULTADES:
+            self.features['dificultad:' + d] = len(self.features)
+        self.nombres = {fold(item['nombre']): j for j, item in enumerate(self.catalog)}
+
+        self.items = np.zeros((len(self.catalog), len(self.features)))
+        for j, item in enumerate(self.catalog):
+            self.items[j, self.features[item['categoria']]] = 1.0
+            column = self.features.get('dificultad:' + item['dificultad'])
+            if column is not None:
+                self.items[j, column] = PESO_DIFICULTAD
+        self.prior = np.zeros(len(self.features))
+
+    def _normalize(self, vectors):
+        # Categories and difficulties are separate distributions, each summing to 1
+        n_cat = len(self.categorias)
+        for block in (slice(0, n_cat), slice(n_cat, None)):
+            sums = vectors[..., block].sum(axis=-1, keepdims=True)
+            np.divide(vectors[..., block], sums, out=vectors[..., block], where=sums > 0)
+        return vectors
+
+    def _add(self, vectors, row, categoria, dificultad, completados, total):
+        weight = completados * PESO_COMPLETADO + (total - completados) * PESO_PENDIENTE
+        for key in (categoria, 'dificultad:' + dificultad):
+            column = self.features.get(key)
+            if column is not None:
+                vectors[row, column] += weight
+
+    def history(self, habitos):
+        """(usuario_id, categoria, dificultad, completados, total) grouped in the database."""
+        return habitos.annotate(dificultad=DIFICULTAD_DE_PUNTOS).values_list(
+            'usuario_id', 'categoria', 'dificultad'
+        ).annotate(
+            completados=Count('pk', filter=Q(estado='completado')), total=Count('pk'),
+        ).order_by()
+
+    def fit_prior(self):
+        """Population-wide affinity, used to break ties and for users without history."""
+        prior = np.zeros((1, len(self.features)))
+        for _, categoria, dificultad, completados, total in self.history(Habito.objects.all()):
+            self._add(prior, 0, categoria, dificultad, completados, total)
+        self.prior = self._normalize(prior)[0]
+
+    def affinities(self, ids):
+        rows = {id_usuario: r for r, id_usuario in enumerate(ids)}
+        vectors = np.zeros((len(ids), len(self.features)))
+        for id_usuario, categoria, dificultad, completados, total in self.history(
+            Habito.objects.filter(usuario_id__in=ids)
+        ):
+            self._add(vectors, rows[id_usuario], categoria, dificultad, completados, total)
+        return self._normalize(vectors) + PESO_GLOBAL * self.prior
+
+    def top_k(self, ids, k):
+        """{id_usuario: [(catalog index, score), ...]} best first, skipping habits the user already has."""
+        if not ids or not self.catalog:
+            return {id_usuario: [] for id_usuario in ids}
+        scores = self.affinities(ids) @ self.items.T
+
+        rows = {id_usuario: r for r, id_usuario in enumerate(ids)}
+        for id_usuario, nombre in Habito.objects.filter(usuario_id__in=ids).values_list('usuario_id', 'nombre').distinct():
+            j = self.nombres.get(fold(nombre))
+            if j is not None:
+                scores[rows[id_usuario], j] = -np.inf
+
+        k = min(k, len(self.catalog))
+        # Unordered top k per row in O(n), then only those k get sorted
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        result = {}
+        for id_usuario, r in rows.items():
+            result[id_usuario] = [
+                (int(j), float(s)) for j, s in zip(best[r], best_scores[r]) if np.isfinite(s)
+            ]
+        return result
+
+    def recommend(self, id_usuario, k):
+        """Online fallback for a user the nightly batch has not covered yet."""
+        return [
+            dict(self.catalog[j], posicion=i, score=round(score, 4))
+            for i, (j, score) in enumerate(self.top_k([id_usuario], k)[id_usuario], start=1)
+        ]
@@ -0,0 +1,106 @@
+"""
+Perfil counters recomputed from habitos and usuario_logro, per id_usuario range.
+Used by `reconcile_profiles` and by the habit import (core/importer.py).
+"""
+from datetime import date, timedelta
+
+from django.db import connection
+
+FIELDS = (
+    'puntos_totales', 'habitos_completados', 'num_habitos_creados',
+    'num_logros_obtenidos', 'racha_actual', 'racha_maxima',
+)
+
+COUNTERS_SQL = """
+SELECT p.id_usuario,
+       p.puntos_totales, p.habitos_completados, p.num_habitos_creados, p.num_logros_obtenidos,
+       COALESCE(h.puntos, 0), COALESCE(h.completados, 0), COALESCE(h.creados, 0), COALESCE(l.logros, 0)
+FROM perfiles p
+LEFT JOIN (
+    SELECT id_usuario,
+           SUM(CASE WHEN estado = 'completado' THEN puntos ELSE 0 END) AS puntos,
+           SUM(CASE WHEN estado = 'completado' THEN 1 ELSE 0 END) AS completados,
+           COUNT(*) AS creados
+    FROM habitos WHERE id_usuario >= %s AND id_usuario <= %s
+    GROUP BY id_usuario
+) h ON h.id_usuario = p.id_usuario
+LEFT JOIN (
+    SELECT id_usuario, COUNT(*) AS logros
+    FROM usuario_logro WHERE id_usuario >= %s AND id_usuario <= %s
+    GROUP BY id_usuario
+) l ON l.id_usuario = p.id_usuario
+WHERE p.id_usuario >= %s AND p.id_usuario <= %s
+"""
+
+# Gaps and islands: consecutive completion days share (day number - row number).
+# The current streak is the island ending today or yesterday, as in the frontend.
+STREAKS_SQL = """
+WITH dias AS (
+    SELECT DISTINCT id_usuario, fecha FROM habitos
+    WHERE estado = 'completado' AND id_usuario >= %s AND id_usuario <= %s
+),
+islas AS (
+    SELECT id_usuario, fecha,
+           {day_number} - ROW_NUMBER() OVER (PARTITION BY id_usuario ORDER BY fecha) AS grupo
+    FROM dias
+),
+rachas AS (
+    SELECT id_usuario, COUNT(*) AS largo, MAX(fecha) AS fin FROM islas GROUP BY id_usuario, grupo
+)
+SELECT p.id_usuario, p.racha_actual, p.racha_maxima,
+       COALESCE(MAX(CASE WHEN r.fin >= %s THEN r.largo END), 0), COALESCE(MAX(r.largo), 0)
+FROM perfiles p LEFT JOIN rachas r ON r.id_usuario = p.id_usuario
+WHERE p.id_usuario >= %s AND p.id_usuario <= %s
+GROUP BY p.id_usuario, p.racha_actual, p.racha_maxima
+"""
+
+DAY_NUMBER = {
+    'postgresql': "(fecha - DATE '2000-01-01')",
+    'sqlite': 'CAST(julianday(fecha) AS INTEGER)',
+}
+
+
+def compute_drift(low, high, fields):
+    """{id_usuario: {field: (current, expected)}} for the profiles in [low, high] that drifted."""
+    drift = {}
+
+    def record(id_usuario, field, current, expected):
+        if field in fields and current != expected:
+            drift.setdefault(id_usuario, {})[field] = (current, expected)
+
+    with connection.cursor() as cursor:
+        cursor.execute(COUNTERS_SQL, [low, high] * 3)
+        for row in cursor.fetchall():
+            id_usuario, current, expected = row[0], row[1:5], row[5:9]
+            for field, cur, exp in zip(FIELDS[:4], current, expected):
+                record(id_usuario, field, cur, int(exp))
+
+        if 'racha_actual' in fields or 'racha_maxima' in fields:
+            yesterday = date.today() - timedelta(days=1)
+            cursor.execute(
+                STREAKS_SQL.format(day_number=DAY_NUMBER[connection.vendor]),
+                [low, high, yesterday, low, high],
+            )
+            for id_usuario, actual, maxima, exp_actual, exp_maxima in cursor.fetchall():
+                record(id_usuario, 'racha_actual', actual, int(exp_actual))
+                record(id_usuario, 'racha_maxima', maxima, int(exp_maxima))
+    return drift
+
+def apply_fixes(drift):
+    """One UPDATE per field for the whole chunk, using CASE on id_usuario."""
+    by_field = {}
+    for id_usuario, values in drift.items():
+        for field, (_, expected) in values.items():
+            by_field.setdefault(field, []).append((id_usuario, expected))
+
+    with connection.cursor() as cursor:
+        for field, pairs in by_field.items():
+            cases = ' '.join(['WHEN %s THEN %s'] * len(pairs))
+            placeholders = ', '.join(['%s'] * len(pairs))
+            params = [v for pair in pairs for v in pair] + [id_usuario for id_usuario, _ in pairs]
+            cursor.execute(
+                'UPDATE perfiles SET {field} = CASE id_usuario {cases} END '
+                'WHERE id_usuario IN ({placeholders})'.format(field=field, cases=cases, placeholders=placeholders),
+                params,
+            )
+    return len(drift)
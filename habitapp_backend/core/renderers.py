@@ -0,0 +1,59 @@
+"""
+JSON rendering and parsing through orjson (a C extension), with DRF's own
+JSONRenderer/JSONParser as the fallback when orjson is not installed.
+
+Output matches DRF's compact UTF-8 JSON byte for byte. Strings, numbers, lists
+and dicts are encoded natively; dates, times and datetimes in raw values (e.g.
+`.values()` rows) are passed through to DRF's encoder, so they keep whatever
+format the installed DRF writes, as does anything else orjson does not know
+(Decimal, lazy strings, ...).
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    print("WARNING: orjson not installed. Falling back to the standard JSON renderer and parser.")
+
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes, as FastJSONRenderer writes them."""
+    if orjson is None:
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def loads(data):
+    """Parses JSON from str or UTF-8 bytes; errors are ValueError either way."""
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
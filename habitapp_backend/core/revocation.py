@@ -0,0 +1,111 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import TokenRevocado
+
+USER_KEY = 'usuario:{}'
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Answers "definitely not present" or
+    "maybe present"; the false positive rate is set by capacity and error_rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: two 64-bit halves of one digest give all k positions
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    """
+    In-process view of tokens_revocados. The Bloom filter is rebuilt from the table
+    every REVOKED_TOKENS_REFRESH seconds, so the usual "not revoked" answer costs no
+    I/O. Only Bloom hits (real revocations or rare false positives) query the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._loaded_at = 0.0
+
+    def _rebuild(self):
+        # Read-only: expired rows are deleted by `prune_revoked_tokens`, off the request path
+        keys = list(TokenRevocado.objects.filter(fecha_expiracion__gt=timezone.now()).values_list('jti', flat=True))
+        bloom = BloomFilter(max(len(keys) * 2, settings.REVOKED_TOKENS_BLOOM_CAPACITY))
+        for key in keys:
+            bloom.add(key)
+        self._filter = bloom
+        self._loaded_at = time.monotonic()
+
+    def _current_filter(self):
+        if self._filter is None or time.monotonic() - self._loaded_at > settings.REVOKED_TOKENS_REFRESH:
+            with self._lock:
+                if self._filter is None or time.monotonic() - self._loaded_at > settings.REVOKED_TOKENS_REFRESH:
+                    self._rebuild()
+        return self._filter
+
+    def is_revoked(self, token):
+        bloom = self._current_filter()
+        jti = token.get('jti')
+        user_key = USER_KEY.format(token.get(settings.SIMPLE_JWT['USER_ID_CLAIM']))
+
+        if jti and jti in bloom and TokenRevocado.objects.filter(jti=jti).exists():
+            return True
+        if user_key in bloom:
+            cutoff = TokenRevocado.objects.filter(jti=user_key).values_list('fecha_revocacion', flat=True).first()
+            # iat has one second resolution; tokens issued in the same second as the
+            # revocation (e.g. the ones returned by ChangePasswordView) stay valid
+            if cutoff is not None and token.get('iat', 0) < int(cutoff.timestamp()):
+                return True
+        return False
+
+    def prune(self):
+        """Deletes the rows of tokens that have expired anyway. Returns how many."""
+        deleted, _ = TokenRevocado.objects.filter(fecha_expiracion__lte=timezone.now()).delete()
+        return deleted
+
+    def revoke_token(self, token):
+        """Revokes a single access or refresh token."""
+        expira = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        TokenRevocado.objects.update_or_create(
+            jti=token['jti'],
+            defaults={'id_usuario': int(token[settings.SIMPLE_JWT['USER_ID_CLAIM']]), 'fecha_expiracion': expira},
+        )
+        self._current_filter().add(token['jti'])
+
+    def revoke_user(self, id_usuario):
+        """Revokes every token issued to the user up to now."""
+        key = USER_KEY.format(id_usuario)
+        now = timezone.now()
+        # Outlives any token issued before now
+        expira = now + max(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'], settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'])
+        TokenRevocado.objects.update_or_create(
+            jti=key, defaults={'id_usuario': id_usuario, 'fecha_revocacion': now, 'fecha_expiracion': expira},
+        )
+        self._current_filter().add(key)
+
+
+revocation_list = RevocationList()
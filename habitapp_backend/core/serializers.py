@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from django.contrib.auth.hashers import make_password
-from .models import Usuario, Perfil, Preferencia, Habito, UsuarioHabito, Logro, UsuarioLogro, UsuarioLog
+from .hashing import make_password
+from .models import Usuario, Perfil, Preferencia, Habito, UsuarioHabito, Logro, UsuarioLogro, UsuarioLog, Recomendacion
+from .dias import unknown_days
 
 class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,8 +33,12 @@ class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
     new_password = serializers.CharField(required=True, min_length=6)
 
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
 class PerfilSerializer(serializers.ModelSerializer):
-    id_usuario = serializers.ReadOnlyField(source='usuario.id_usuario')
+    # The column itself: usuario.id_usuario would load the user row for every profile
+    id_usuario = serializers.ReadOnlyField(source='usuario_id')
 
     class Meta:
         model = Perfil
@@ -47,8 +52,13 @@ class RankingSerializer(serializers.ModelSerializer):
         model = Perfil
         fields = ['id_usuario', 'username', 'avatar_url', 'puntos_totales', 'racha_actual', 'habitos_completados']
 
+# Same output as RankingSerializer, built from tuples (see serializer_rows)
+RANKING_COLUMNS = (
+    'usuario_id', 'usuario__username', 'avatar_url', 'puntos_totales', 'racha_actual', 'habitos_completados',
+)
+
 class PreferenciaSerializer(serializers.ModelSerializer):
-    id_usuario = serializers.ReadOnlyField(source='usuario.id_usuario')
+    id_usuario = serializers.ReadOnlyField(source='usuario_id')
 
     class Meta:
         model = Preferencia
@@ -57,10 +67,31 @@ class PreferenciaSerializer(serializers.ModelSerializer):
 class HabitoSerializer(serializers.ModelSerializer):
     # Explicitly handle fecha as DateField to avoid datetime/date mismatch
     fecha = serializers.DateField(format='%Y-%m-%d', input_formats=['%Y-%m-%d', 'iso-8601'])
+    # Derived from dias on save
+    dias_mask = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Habito
-        fields = ['id_habito', 'nombre', 'descripcion', 'puntos', 'fecha', 'categoria', 'dias', 'estado']
+        fields = ['id_habito', 'nombre', 'descripcion', 'puntos', 'fecha', 'categoria', 'dias', 'dias_mask', 'estado']
+
+    def validate_dias(self, value):
+        unknown = unknown_days(value)
+        if unknown:
+            raise serializers.ValidationError('Días no reconocidos: {}'.format(', '.join(t.strip() for t in unknown)))
+        return value
+
+# Plain columns, so HabitoSerializer's field names double as the query's
+HABITO_COLUMNS = tuple(HabitoSerializer.Meta.fields)
+
+
+def serializer_rows(queryset, serializer_class, columns):
+    """
+    Read-only fast path: the output of serializer_class(queryset, many=True).data
+    built from values_list() tuples, without model instances or field objects.
+    Raw dates are left to the renderer (core/renderers.py).
+    """
+    fields = serializer_class.Meta.fields
+    return [dict(zip(fields, row)) for row in queryset.values_list(*columns)]
 
 class UsuarioHabitoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -77,7 +108,32 @@ class UsuarioLogroSerializer(serializers.ModelSerializer):
         model = UsuarioLogro
         fields = ['usuario', 'logro', 'fecha_obtencion']
 
+# Audit rows copy the whole usuarios row (signals and SQL triggers alike); the
+# password hash must never leave the server with them.
+LOG_SECRET_KEYS = ('password', 'password_hash')
+
+
+class AuditDataField(serializers.JSONField):
+    """Audit JSON without LOG_SECRET_KEYS. `from_column` also serves values_list() rows (core/sparse.py)."""
+
+    def from_column(self, value):
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if k not in LOG_SECRET_KEYS}
+        return value
+
+    def to_representation(self, value):
+        return super().to_representation(self.from_column(value))
+
+
 class UsuarioLogSerializer(serializers.ModelSerializer):
+    datos_anteriores = AuditDataField(read_only=True)
+    datos_nuevos = AuditDataField(read_only=True)
+
     class Meta:
         model = UsuarioLog
         fields = '__all__'
+
+class RecomendacionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Recomendacion
+        fields = ['posicion', 'nombre', 'categoria', 'dificultad', 'puntos', 'score']
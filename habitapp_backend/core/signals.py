@@ -1,7 +1,9 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.forms.models import model_to_dict
-from .models import Usuario, UsuarioLog
+from .models import Usuario, UsuarioLog, Habito, UsuarioHabito, Perfil, Logro
+from .cache import invalidate_usuario, bump_habitos_generation
+from .achievements import achievement_engine
 import json
 
 # Note: The SQL triggers already handle logging for 'usuarios' table.
@@ -15,6 +17,39 @@ import json
 def serialize_data(data):
     return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
 
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidate_usuario_cache(sender, instance, **kwargs):
+    invalidate_usuario(instance.id_usuario)
+
+@receiver(post_save, sender=Habito)
+@receiver(post_delete, sender=Habito)
+def invalidate_habitos_cache(sender, instance, **kwargs):
+    if instance.usuario_id is not None:
+        bump_habitos_generation(instance.usuario_id)
+
+# Only post_save for UsuarioHabito: a delete receiver would stop Django from
+# fast-deleting links, and its fake primary key (id_usuario) would then delete
+# every link of the user. Link deletes are covered by the Habito receiver and
+# UsuarioHabitoViewSet.perform_destroy.
+@receiver(post_save, sender=UsuarioHabito)
+def invalidate_habitos_cache_link(sender, instance, **kwargs):
+    bump_habitos_generation(instance.usuario_id)
+
+@receiver(post_save, sender=Perfil)
+def unlock_achievements(sender, instance, created, **kwargs):
+    before = getattr(instance, '_loaded_counters', {})
+    after = {f: getattr(instance, f) for f in Perfil.COUNTER_FIELDS}
+    unlocked = achievement_engine.on_counters_changed(instance.usuario_id, before, after)
+    if unlocked:
+        instance.num_logros_obtenidos += unlocked
+    instance._loaded_counters = after
+
+@receiver(post_save, sender=Logro)
+@receiver(post_delete, sender=Logro)
+def reload_achievements(sender, instance, **kwargs):
+    achievement_engine.invalidate()
+
 @receiver(post_save, sender=Usuario)
 def log_usuario_save(sender, instance, created, **kwargs):
     if created:
@@ -0,0 +1,94 @@
+"""
+Sparse fieldsets and the columnar layout for list endpoints.
+
+    GET /api/habitos/?fields=id_habito,estado,puntos
+    GET /api/ranking/?fields=id_usuario,puntos_totales&compact=true
+
+`fields` narrows both the SELECT (values_list() of the fields' sources) and the
+output; unknown names are a 400. `compact=true` answers {"cols": [...],
+"rows": [[...], ...]} instead of one object per row, which drops the repeated
+keys from large lists. Fields are always listed in the serializer's order.
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+FIELDS_PARAM = 'fields'
+COMPACT_PARAM = 'compact'
+
+
+def readable_fields(serializer_class):
+    return [name for name, field in serializer_class().fields.items() if not field.write_only]
+
+
+def requested_fields(request, serializer_class):
+    """The readable fields named in ?fields=, or None when the parameter is absent."""
+    raw = request.query_params.get(FIELDS_PARAM)
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    available = readable_fields(serializer_class)
+    unknown = sorted(names - set(available))
+    if unknown or not names:
+        raise serializers.ValidationError({FIELDS_PARAM: ['Campos no reconocidos: {}'.format(', '.join(unknown) or raw)]})
+    return [name for name in available if name in names]
+
+
+def is_compact(request):
+    return request.query_params.get(COMPACT_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def source_columns(serializer_class, fields):
+    """values_list() arguments for the fields, or None if one is not a plain column."""
+    declared = serializer_class().fields
+    columns = []
+    for name in fields:
+        field = declared[name]
+        if field.source == '*' or isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+            return None
+        columns.append(field.source.replace('.', '__'))
+    return columns
+
+
+def column_rows(serializer_class, fields, rows):
+    """
+    values_list() rows passed through the fields' `from_column(value)` hooks,
+    for fields whose output is not the raw column (e.g. AuditDataField).
+    """
+    declared = serializer_class().fields
+    hooks = [getattr(declared[name], 'from_column', None) for name in fields]
+    if not any(hooks):
+        return rows
+    return (tuple(hook(value) if hook else value for hook, value in zip(hooks, row)) for row in rows)
+
+
+def layout(fields, rows, compact):
+    """Serializer-shaped output from row tuples, in either layout."""
+    if compact:
+        return {'cols': list(fields), 'rows': [list(row) for row in rows]}
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def project(data, fields, compact):
+    """Narrows already serialized dicts to `fields`."""
+    return layout(fields, ([item[f] for f in fields] for item in data), compact)
+
+
+def sparse_rows(queryset, serializer_class, fields, compact):
+    columns = source_columns(serializer_class, fields)
+    if columns is None:
+        return project(serializer_class(queryset, many=True).data, fields, compact)
+    return layout(fields, column_rows(serializer_class, fields, queryset.values_list(*columns)), compact)
+
+
+class SparseFieldsMixin:
+    """?fields= and ?compact= for the list action of a DRF generic view or viewset."""
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields = requested_fields(request, serializer_class)
+        compact = is_compact(request)
+        if fields is None and not compact:
+            return super().list(request, *args, **kwargs)
+        fields = fields or readable_fields(serializer_class)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(sparse_rows(queryset, serializer_class, fields, compact))
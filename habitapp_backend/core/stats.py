@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractIsoWeekDay
+
+from .models import Habito, Logro
+
+DIAS_SEMANA = ('Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom')
+
+COMPLETADO = Q(estado='completado')
+
+
+def _rate(completados, total):
+    return round(completados / total, 4) if total else 0.0
+
+
+def habit_summary(id_usuario, today):
+    """
+    Completion figures over the user's habits, the server-side counterpart of
+    src/utils/habitCalculations.ts. Three grouped queries; each habit counts
+    as one completion on its fecha when its estado is 'completado'.
+    """
+    habitos = Habito.objects.filter(usuario_id=id_usuario)
+
+    por_categoria = []
+    for row in habitos.values('categoria').annotate(
+        total=Count('pk'),
+        completados=Count('pk', filter=COMPLETADO),
+        puntos=Sum('puntos', filter=COMPLETADO),
+    ).order_by('categoria'):
+        por_categoria.append({
+            'categoria': row['categoria'],
+            'total': row['total'],
+            'completados': row['completados'],
+            'tasa_completado': _rate(row['completados'], row['total']),
+            'puntos': row['puntos'] or 0,
+        })
+
+    # ISO weekday: 1 is Monday, as in DIAS_SEMANA
+    por_dia = {
+        row['dia']: row for row in habitos.annotate(dia=ExtractIsoWeekDay('fecha')).values('dia').annotate(
+            total=Count('pk'), completados=Count('pk', filter=COMPLETADO),
+        ).order_by()
+    }
+    por_dia_semana = []
+    for dia, nombre in enumerate(DIAS_SEMANA, start=1):
+        row = por_dia.get(dia, {'total': 0, 'completados': 0})
+        por_dia_semana.append({
+            'dia': nombre,
+            'total': row['total'],
+            'completados': row['completados'],
+            'tasa_completado': _rate(row['completados'], row['total']),
+        })
+
+    desde = today - timedelta(days=6)
+    por_fecha = dict(
+        habitos.filter(COMPLETADO, fecha__gte=desde, fecha__lte=today)
+        .values('fecha').annotate(completados=Count('pk')).order_by().values_list('fecha', 'completados')
+    )
+    ultima_semana = []
+    for offset in range(7):
+        fecha = desde + timedelta(days=offset)
+        ultima_semana.append({
+            'fecha': fecha.isoformat(),
+            'dia': DIAS_SEMANA[fecha.weekday()],
+            'completados': por_fecha.get(fecha, 0),
+        })
+
+    total = sum(c['total'] for c in por_categoria)
+    completados = sum(c['completados'] for c in por_categoria)
+    return {
+        'habitos': total,
+        'completados': completados,
+        'pendientes': total - completados,
+        'tasa_completado': _rate(completados, total),
+        'puntos_completados': sum(c['puntos'] for c in por_categoria),
+        'completados_hoy': por_fecha.get(today, 0),
+        'por_categoria': por_categoria,
+        'por_dia_semana': por_dia_semana,
+        'ultima_semana': ultima_semana,
+    }
+
+
+def profile_summary(perfil):
+    """Level and achievement progress from the Perfil counters (not cached, they move on their own)."""
+    return {
+        'puntos_totales': perfil.puntos_totales,
+        'nivel': perfil.puntos_totales // 100 + 1,
+        'progreso_nivel': perfil.puntos_totales % 100,
+        'racha_actual': perfil.racha_actual,
+        'racha_maxima': perfil.racha_maxima,
+        'logros_obtenidos': perfil.num_logros_obtenidos,
+        'logros_totales': Logro.objects.count(),
+    }
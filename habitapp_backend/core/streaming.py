@@ -0,0 +1,162 @@
+"""
+Streaming JSON / NDJSON responses for large lists and the per-user export.
+
+Rows come from values_list().iterator(chunk_size=STREAM_CHUNK_SIZE): a
+server-side cursor on Postgres, fetchmany() batches elsewhere. They are encoded
+and, when the client accepts it, compressed chunk by chunk (brotli if the
+module is installed, else gzip), so a worker holds one chunk at a time however
+long the list is.
+
+    GET /api/habitos/?stream=ndjson        one JSON object per line
+    GET /api/logs/?stream=json&fields=...  a JSON array, written incrementally
+"""
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import serializers
+
+from .renderers import dumps
+from .sparse import column_rows, is_compact, readable_fields, requested_fields, source_columns
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STREAM_PARAM = 'stream'
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def stream_format(request):
+    """'ndjson', 'json' or None, from ?stream= or an Accept: application/x-ndjson header."""
+    value = request.query_params.get(STREAM_PARAM)
+    if value is None:
+        return 'ndjson' if CONTENT_TYPES['ndjson'] in request.headers.get('Accept', '') else None
+    if value not in CONTENT_TYPES:
+        raise serializers.ValidationError({STREAM_PARAM: ['Formato no válido, usa json o ndjson.']})
+    return value
+
+
+def iter_rows(queryset, columns):
+    # Pin the alias now: the generator runs after the view (and any replica routing) returns
+    return queryset.using(queryset.db).values_list(*columns).iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ndjson_chunks(fields, rows):
+    for chunk in chunked(rows, settings.STREAM_CHUNK_SIZE):
+        yield b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in chunk)
+
+
+def json_array_chunks(fields, rows, compact=False):
+    """A JSON array of objects (or, compact, {"cols": ..., "rows": [...]}) built one chunk at a time."""
+    if compact:
+        yield b'{"cols":' + dumps(list(fields)) + b',"rows":['
+    else:
+        yield b'['
+    first = True
+    for chunk in chunked(rows, settings.STREAM_CHUNK_SIZE):
+        items = (dumps(list(row)) if compact else dumps(dict(zip(fields, row))) for row in chunk)
+        body = b','.join(items)
+        yield body if first else b',' + body
+        first = False
+    yield b']}' if compact else b']'
+
+
+def compressed(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.STREAM_BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        # wbits=31: gzip container
+        compressor = zlib.compressobj(settings.STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            # Sync flush so the client receives every chunk as it is produced
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def accepted_encoding(request):
+    accept = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and 'br' in accept:
+        return 'br'
+    if 'gzip' in accept:
+        return 'gzip'
+    return None
+
+
+def streaming_response(request, chunks, content_type, filename=None):
+    encoding = accepted_encoding(request)
+    if encoding:
+        chunks = compressed(chunks, encoding)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if filename:
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+def stream_queryset(request, queryset, serializer_class, fmt):
+    """Streams a list endpoint's rows, honouring ?fields= and ?compact=."""
+    fields = requested_fields(request, serializer_class) or readable_fields(serializer_class)
+    columns = source_columns(serializer_class, fields)
+    if columns is None:
+        raise serializers.ValidationError({STREAM_PARAM: ['Estos campos no se pueden transmitir en streaming.']})
+    rows = column_rows(serializer_class, fields, iter_rows(queryset, columns))
+    if fmt == 'ndjson':
+        return streaming_response(request, ndjson_chunks(fields, rows), CONTENT_TYPES['ndjson'])
+    return streaming_response(request, json_array_chunks(fields, rows, is_compact(request)), CONTENT_TYPES['json'])
+
+
+class StreamingListMixin:
+    """?stream=json|ndjson for the list action of a DRF generic view or viewset."""
+
+    def list(self, request, *args, **kwargs):
+        fmt = stream_format(request)
+        if fmt is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_queryset(request, queryset, self.get_serializer_class(), fmt)
+
+
+def export_chunks(sections, fmt):
+    """
+    The user's data export. `sections` is a list of (name, fields, rows, many)
+    with rows from iter_rows(); single-row sections are written as an object
+    (or null). JSON is one document keyed by section, NDJSON one line per row
+    with a "tipo" key naming its section.
+    """
+    if fmt == 'ndjson':
+        for name, fields, rows, many in sections:
+            for chunk in chunked(rows, settings.STREAM_CHUNK_SIZE):
+                yield b''.join(dumps({'tipo': name, **dict(zip(fields, row))}) + b'\n' for row in chunk)
+        return
+
+    yield b'{'
+    for i, (name, fields, rows, many) in enumerate(sections):
+        yield (b',' if i else b'') + dumps(name) + b':'
+        if many:
+            yield from json_array_chunks(fields, rows)
+        else:
+            row = next(iter(rows), None)
+            yield dumps(dict(zip(fields, row)) if row is not None else None)
+    yield b'}'
@@ -0,0 +1,7 @@
+import unicodedata
+
+
+def fold(text):
+    """Lower case, accents removed and whitespace collapsed: 'Mié ' and 'mie' compare equal."""
+    plain = unicodedata.normalize('NFKD', (text or '').lower())
+    return ' '.join(''.join(c for c in plain if not unicodedata.combining(c)).split())
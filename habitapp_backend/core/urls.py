@@ -4,8 +4,8 @@ from .views import (
     UsuarioViewSet, PerfilViewSet, PreferenciaViewSet, 
     HabitoViewSet, UsuarioHabitoViewSet, LogroViewSet, 
     UsuarioLogroViewSet, UsuarioLogViewSet,
-    RegisterView, LoginView, UserProfileView, RankingView, ChangePasswordView,
-    PrologDemoView, ChatBotView
+    RegisterView, LoginView, LogoutView, UserProfileView, RankingView, StatsSummaryView, RecommendationsView, ExportView, ChangePasswordView,
+    PrologDemoView, ChatBotView, HealthView
 )
 
 router = DefaultRouter()
@@ -22,9 +22,14 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
     path('auth/change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('user/me/', UserProfileView.as_view(), name='user-profile'),
     path('ranking/', RankingView.as_view(), name='ranking'),
+    path('stats/summary/', StatsSummaryView.as_view(), name='stats-summary'),
+    path('recommendations/', RecommendationsView.as_view(), name='recommendations'),
+    path('export/', ExportView.as_view(), name='export'),
     path('prolog-demo/', PrologDemoView.as_view(), name='prolog-demo'),
     path('chat/', ChatBotView.as_view(), name='chat'),
+    path('health/', HealthView.as_view(), name='health'),
 ]
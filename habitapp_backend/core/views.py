@@ -2,18 +2,56 @@ from rest_framework import viewsets, status, generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from django.contrib.auth.hashers import check_password
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Usuario, Perfil, Preferencia, Habito, UsuarioHabito, Logro, UsuarioLogro, UsuarioLog
+from rest_framework_simplejwt.exceptions import TokenError
+from .models import Usuario, Perfil, Preferencia, Habito, UsuarioHabito, Logro, UsuarioLogro, UsuarioLog, Recomendacion
 from .prolog_service import PrologService
 from .chat_service import ChatService
+from .revocation import revocation_list
+from .hashing import check_password, make_password
+from .db_pool import pool_stats
+from .db_router import ReplicaReadMixin
+from .achievements import achievement_engine
+from .write_behind import profile_write_behind
+from .cache import (
+    get_habitos_generation, get_cached_habitos, set_cached_habitos, bump_habitos_generation,
+    get_cached_stats, set_cached_stats,
+)
+from .stats import habit_summary, profile_summary
+from .recommender import Recommender
+from .autocomplete import suggest
+from .dias import day_bit
+from .sparse import (
+    SparseFieldsMixin, requested_fields, readable_fields, is_compact, sparse_rows, project, source_columns, column_rows,
+)
+from .importer import HabitImport, ImportRejected, import_format
+from .streaming import (
+    StreamingListMixin, CONTENT_TYPES, stream_format, stream_queryset, streaming_response, export_chunks, iter_rows,
+)
+from datetime import date
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.db import connection, DatabaseError
+from django.db.models import F
+from django.utils import timezone
+from django.conf import settings
 from .serializers import (
-    UsuarioSerializer, RegisterSerializer, LoginSerializer, ChangePasswordSerializer,
+    UsuarioSerializer, RegisterSerializer, LoginSerializer, ChangePasswordSerializer, LogoutSerializer,
     PerfilSerializer, PreferenciaSerializer, 
     HabitoSerializer, UsuarioHabitoSerializer, LogroSerializer, 
-    UsuarioLogroSerializer, UsuarioLogSerializer, RankingSerializer
+    UsuarioLogroSerializer, UsuarioLogSerializer, RankingSerializer, RecomendacionSerializer,
+    serializer_rows, HABITO_COLUMNS, RANKING_COLUMNS,
 )
 
+def user_today(id_usuario):
+    # The user's calendar day, from their preferred time zone when it is valid
+    zona = Preferencia.objects.filter(usuario_id=id_usuario).values_list('zona_horaria', flat=True).first()
+    try:
+        return timezone.localdate(timezone=ZoneInfo(zona)) if zona else timezone.localdate()
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.localdate()
+
 class RegisterView(generics.CreateAPIView):
     queryset = Usuario.objects.all()
     permission_classes = (permissions.AllowAny,)
@@ -43,7 +81,7 @@ class LoginView(APIView):
         except Usuario.DoesNotExist:
             return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-        if not check_password(password, user.password):
+        if not check_password(user, password):
             return Response({'error': 'Contraseña incorrecta'}, status=status.HTTP_401_UNAUTHORIZED)
         
         refresh = RefreshToken.for_user(user)
@@ -64,25 +102,56 @@ class ChangePasswordView(APIView):
     def post(self, request):
         serializer = ChangePasswordSerializer(data=request.data)
         if serializer.is_valid():
-            user = request.user
-            if not check_password(serializer.data.get("old_password"), user.password):
+            # Password checks always read the row fresh rather than from the user cache
+            user = Usuario.objects.get(pk=request.user.id_usuario)
+            if not check_password(user, serializer.data.get("old_password")):
                 return Response({"old_password": ["Contraseña incorrecta."]}, status=status.HTTP_400_BAD_REQUEST)
             
-            user.set_password(serializer.data.get("new_password"))
+            user.password = make_password(serializer.data.get("new_password"))
             user.save()
-            return Response({"status": "success", "message": "Contraseña actualizada correctamente."}, status=status.HTTP_200_OK)
+
+            # Sign out every other session and hand this client fresh tokens
+            revocation_list.revoke_user(user.id_usuario)
+            refresh = RefreshToken.for_user(user)
+            return Response({
+                "status": "success",
+                "message": "Contraseña actualizada correctamente.",
+                "refresh": str(refresh),
+                "access": str(refresh.access_token),
+            }, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data)
+        if serializer.is_valid():
+            revocation_list.revoke_token(request.auth)
+
+            refresh = serializer.validated_data.get('refresh')
+            if refresh:
+                try:
+                    refresh_token = RefreshToken(refresh)
+                except TokenError:
+                    return Response({"refresh": ["Token inválido."]}, status=status.HTTP_400_BAD_REQUEST)
+                if str(refresh_token.get('user_id')) == str(request.user.id_usuario):
+                    revocation_list.revoke_token(refresh_token)
+
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class UsuarioViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
 
-class PerfilViewSet(viewsets.ModelViewSet):
+class PerfilViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Perfil.objects.all()
     serializer_class = PerfilSerializer
 
-class PreferenciaViewSet(viewsets.ModelViewSet):
+class PreferenciaViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Preferencia.objects.all()
     serializer_class = PreferenciaSerializer
 
@@ -92,19 +161,106 @@ class HabitoViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Filter habits by the current user
+        # Filter habits by the current user (denormalized owner, no join needed)
         user = self.request.user
-        return Habito.objects.filter(usuariohabito__usuario=user)
+        return Habito.objects.filter(usuario_id=user.id_usuario)
+
+    def list(self, request, *args, **kwargs):
+        fmt = stream_format(request)
+        if fmt is not None:
+            # Streamed straight from the database, bypassing the cache
+            return stream_queryset(request, self.filter_queryset(self.get_queryset()), HabitoSerializer, fmt)
+        fields = requested_fields(request, HabitoSerializer)
+        compact = is_compact(request)
+        # Served from the per-user cache; any habit write bumps the generation
+        id_usuario = request.user.id_usuario
+        generation = get_habitos_generation(id_usuario)
+        data = get_cached_habitos(id_usuario, generation)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if fields is not None:
+                # Narrowed SELECT; only the full list goes to the cache
+                return Response(sparse_rows(queryset, HabitoSerializer, fields, compact))
+            data = serializer_rows(queryset, HabitoSerializer, HABITO_COLUMNS)
+            set_cached_habitos(id_usuario, generation, data)
+        if fields is not None or compact:
+            return Response(project(data, fields or readable_fields(HabitoSerializer), compact))
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def today(self, request):
+        # Habits due today (or on ?fecha=YYYY-MM-DD), tested with the day bit in the database
+        fecha = request.query_params.get('fecha')
+        if fecha:
+            try:
+                day = date.fromisoformat(fecha)
+            except ValueError:
+                return Response({"fecha": ["Formato de fecha inválido, usa YYYY-MM-DD."]}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            day = user_today(request.user.id_usuario)
+        habitos = self.get_queryset().alias(
+            vence=F('dias_mask').bitand(day_bit(day))
+        ).exclude(vence=0)
+        fields = requested_fields(request, HabitoSerializer) or readable_fields(HabitoSerializer)
+        return Response(sparse_rows(habitos, HabitoSerializer, fields, is_compact(request)))
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        # Name suggestions from the catalog and popular habits, accent-insensitive
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), settings.AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response({"limit": ["Debe ser un número entero."]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(suggest(request.query_params.get('q', ''), max(limit, 1)))
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', parser_classes=[MultiPartParser])
+    def import_history(self, request):
+        # Multipart "file", or the file itself as a text/csv or application/x-ndjson body.
+        # ?file_format= overrides the detection (?format= is DRF's renderer override)
+        fmt = request.query_params.get('file_format')
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"file": ["Adjunta el archivo a importar."]}, status=status.HTTP_400_BAD_REQUEST)
+            fileobj, fmt = upload, import_format(fmt, upload.name, upload.content_type)
+        else:
+            # Read straight from the request body, never parsed into memory
+            fileobj, fmt = request.stream or [], import_format(fmt, content_type=request.content_type)
+        if fmt is None:
+            return Response({"format": ["Formato no reconocido, usa csv o ndjson."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        skip_invalid = request.query_params.get('skip_invalid', '').lower() in ('1', 'true', 'yes')
+        try:
+            summary = HabitImport(request.user.id_usuario, skip_invalid=skip_invalid).run(fileobj, fmt)
+        except ImportRejected as e:
+            return Response(
+                {'importados': 0, 'invalidos': e.invalid, 'errores': e.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(summary, status=status.HTTP_201_CREATED)
 
     def perform_create(self, serializer):
-        # Create the habit
-        habito = serializer.save()
+        # Create the habit with its owner set
+        id_usuario = self.request.user.id_usuario
+        habito = serializer.save(usuario_id=id_usuario)
         # Link it to the current user
-        UsuarioHabito.objects.create(usuario=self.request.user, habito=habito)
+        UsuarioHabito.objects.create(usuario_id=id_usuario, habito=habito)
         
         # Update profile stats (num_habitos_creados)
+        if profile_write_behind.enabled:
+            perfil = Perfil.objects.filter(usuario_id=id_usuario).first()
+            if perfil is None:
+                return
+            # Count from what users see, flushed or not
+            profile_write_behind.apply_pending([perfil])
+            before = {'num_habitos_creados': perfil.num_habitos_creados}
+            profile_write_behind.add(id_usuario, {'num_habitos_creados': 1})
+            # No post_save here, so unlock achievements directly
+            achievement_engine.on_counters_changed(
+                id_usuario, before, {'num_habitos_creados': before['num_habitos_creados'] + 1}
+            )
+            return
         try:
-            perfil = Perfil.objects.get(usuario=self.request.user)
+            perfil = Perfil.objects.get(usuario_id=id_usuario)
             perfil.num_habitos_creados += 1
             perfil.save()
         except Perfil.DoesNotExist:
@@ -127,7 +283,11 @@ class HabitoViewSet(viewsets.ModelViewSet):
         # Update points and streaks if estado changed
         if old_estado != new_estado:
             try:
-                perfil = Perfil.objects.get(usuario=request.user)
+                perfil = Perfil.objects.get(usuario_id=request.user.id_usuario)
+                if profile_write_behind.enabled:
+                    # Work on the counters as users see them, flushed or not
+                    profile_write_behind.apply_pending([perfil])
+                    before = {f: getattr(perfil, f) for f in Perfil.COUNTER_FIELDS + ('racha_actual',)}
                 
                 if old_estado == 'pendiente' and new_estado == 'completado':
                     # Habit completed: add points
@@ -140,14 +300,14 @@ class HabitoViewSet(viewsets.ModelViewSet):
                     
                     # Get all user's habits completed today
                     user_habits = Habito.objects.filter(
-                        usuariohabito__usuario=request.user,
+                        usuario_id=request.user.id_usuario,
                         estado='completado',
                         fecha=today
                     )
                     
                     # Get habits completed yesterday
                     habits_yesterday = Habito.objects.filter(
-                        usuariohabito__usuario=request.user,
+                        usuario_id=request.user.id_usuario,
                         estado='completado',
                         fecha=yesterday
                     )
@@ -176,42 +336,65 @@ class HabitoViewSet(viewsets.ModelViewSet):
                     
                     print("Subtracted {} points. Total: {}".format(instance.puntos, perfil.puntos_totales))
                 
-                perfil.save()
+                if profile_write_behind.enabled:
+                    after = {f: getattr(perfil, f) for f in before}
+                    profile_write_behind.add(request.user.id_usuario, {
+                        f: after[f] - before[f] for f in ('puntos_totales', 'habitos_completados', 'racha_actual')
+                    })
+                    # No post_save here, so unlock achievements directly
+                    achievement_engine.on_counters_changed(request.user.id_usuario, before, after)
+                else:
+                    perfil.save()
                 
             except Perfil.DoesNotExist:
-                print("Profile not found for user {}".format(request.user.username))
+                print("Profile not found for user {}".format(request.user.id_usuario))
                 pass
         
         return response
 
-class UsuarioHabitoViewSet(viewsets.ModelViewSet):
+class UsuarioHabitoViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = UsuarioHabito.objects.all()
     serializer_class = UsuarioHabitoSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class LogroViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        link = serializer.save()
+        # Keep the denormalized owner on habitos consistent with the link table
+        Habito.objects.filter(pk=link.habito_id).update(usuario_id=link.usuario_id)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_habitos_generation(instance.usuario_id)
+
+class LogroViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Logro.objects.all()
     serializer_class = LogroSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class UsuarioLogroViewSet(viewsets.ModelViewSet):
+class UsuarioLogroViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = UsuarioLogro.objects.all()
     serializer_class = UsuarioLogroSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class UsuarioLogViewSet(viewsets.ReadOnlyModelViewSet):
+class UsuarioLogViewSet(ReplicaReadMixin, StreamingListMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
     queryset = UsuarioLog.objects.all()
     serializer_class = UsuarioLogSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-class UserProfileView(APIView):
+    def get_queryset(self):
+        # Only the caller's own audit trail
+        return UsuarioLog.objects.filter(id_usuario=self.request.user.id_usuario)
+
+class UserProfileView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        user = request.user.usuario
         try:
-            perfil = Perfil.objects.get(usuario=user)
-            preferencias = Preferencia.objects.get(usuario=user)
+            perfil = Perfil.objects.get(usuario_id=user.id_usuario)
+            preferencias = Preferencia.objects.get(usuario_id=user.id_usuario)
+            if profile_write_behind.enabled:
+                profile_write_behind.apply_pending([perfil])
             
             return Response({
                 'user': {
@@ -226,7 +409,7 @@ class UserProfileView(APIView):
             return Response({'error': 'Profile or Preferences not found'}, status=404)
 
     def patch(self, request):
-        user = request.user
+        user = request.user.usuario
         data = request.data
         
         # Update User (username, email)
@@ -264,17 +447,107 @@ class UserProfileView(APIView):
         return self.get(request)
 
     def delete(self, request):
-        user = request.user
+        user = request.user.usuario
+        revocation_list.revoke_user(user.id_usuario)
         user.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
         
-class RankingView(generics.ListAPIView):
+class RankingView(ReplicaReadMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = RankingSerializer
     
     def get_queryset(self):
         return Perfil.objects.select_related('usuario').all().order_by('-puntos_totales')
 
+    def list(self, request, *args, **kwargs):
+        fields = requested_fields(request, RankingSerializer) or readable_fields(RankingSerializer)
+        compact = is_compact(request)
+        # Tuples instead of Perfil instances; the ordering comes from get_queryset
+        queryset = self.filter_queryset(self.get_queryset())
+        fmt = stream_format(request)
+        if fmt is not None:
+            # Database order as is: unflushed write-behind points are not merged here
+            return stream_queryset(request, queryset, RankingSerializer, fmt)
+        if not profile_write_behind.enabled:
+            return Response(sparse_rows(queryset, RankingSerializer, fields, compact))
+        # Merge the requesting user's unflushed points so they see their own writes
+        rows = serializer_rows(queryset, RankingSerializer, RANKING_COLUMNS)
+        id_usuario = request.user.id_usuario
+        pending = profile_write_behind.pending([id_usuario]).get(id_usuario, {})
+        for row in rows:
+            if row['id_usuario'] == id_usuario:
+                for field, delta in pending.items():
+                    if field in row:
+                        row[field] += delta
+        rows.sort(key=lambda row: -row['puntos_totales'])
+        return Response(project(rows, fields, compact))
+
+class StatsSummaryView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Dashboard figures from grouped aggregates; the habit part is cached per habit generation
+        id_usuario = request.user.id_usuario
+        today = user_today(id_usuario)
+        generation = get_habitos_generation(id_usuario)
+        data = get_cached_stats(id_usuario, generation, today)
+        if data is None:
+            data = habit_summary(id_usuario, today)
+            set_cached_stats(id_usuario, generation, today, data)
+
+        try:
+            perfil = Perfil.objects.get(usuario_id=id_usuario)
+        except Perfil.DoesNotExist:
+            return Response({'error': 'Profile not found'}, status=404)
+        if profile_write_behind.enabled:
+            profile_write_behind.apply_pending([perfil])
+        return Response({**data, **profile_summary(perfil)})
+
+class RecommendationsView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Precomputed nightly by build_recommendations: one read on the (id_usuario, posicion) index
+        id_usuario = request.user.id_usuario
+        recomendaciones = Recomendacion.objects.filter(id_usuario=id_usuario).order_by('posicion')
+        data = RecomendacionSerializer(recomendaciones, many=True).data
+        if not data:
+            # Not covered by the last batch yet (new user)
+            data = Recommender().recommend(id_usuario, settings.RECOMMENDATIONS_TOP_K)
+        fields = requested_fields(request, RecomendacionSerializer)
+        compact = is_compact(request)
+        if fields is not None or compact:
+            return Response(project(data, fields or readable_fields(RecomendacionSerializer), compact))
+        return Response(data)
+
+class ExportView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Everything stored for the user, streamed as one JSON document (or NDJSON with ?stream=ndjson)
+        fmt = stream_format(request) or 'json'
+        user = request.user.usuario
+        id_usuario = user.id_usuario
+
+        def section(name, serializer_class, queryset, many=True):
+            fields = readable_fields(serializer_class)
+            rows = iter_rows(queryset, source_columns(serializer_class, fields))
+            return name, fields, column_rows(serializer_class, fields, rows), many
+
+        sections = [
+            section('usuario', UsuarioSerializer, Usuario.objects.filter(pk=id_usuario), many=False),
+            section('perfil', PerfilSerializer, Perfil.objects.filter(usuario_id=id_usuario), many=False),
+            section('preferencias', PreferenciaSerializer, Preferencia.objects.filter(usuario_id=id_usuario), many=False),
+            section('habitos', HabitoSerializer, Habito.objects.filter(usuario_id=id_usuario).order_by('id_habito')),
+            ('logros', ['id_logro', 'nombre', 'puntos', 'fecha_obtencion'], iter_rows(
+                UsuarioLogro.objects.filter(usuario_id=id_usuario).order_by('fecha_obtencion'),
+                ['logro_id', 'logro__nombre', 'logro__puntos', 'fecha_obtencion'],
+            ), True),
+            section('logs', UsuarioLogSerializer, UsuarioLog.objects.filter(id_usuario=id_usuario).order_by('id_log')),
+        ]
+        filename = 'habitmaster-{}-{}.{}'.format(user.username, timezone.localdate().isoformat(), fmt)
+        return streaming_response(request, export_chunks(sections, fmt), CONTENT_TYPES[fmt], filename)
+
 class PrologDemoView(APIView):
     permission_classes = [permissions.AllowAny] # Allow any for demo purposes, or IsAuthenticated
 
@@ -352,3 +625,16 @@ class ChatBotView(APIView):
             'response': response_text,
             'message': current_msg_obj # Return the formatted user message to append to state if needed
         })
+
+class HealthView(APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        # Liveness check plus per-process connection pool statistics
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as e:
+            return Response({'status': 'error', 'database': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'status': 'ok', 'pool': pool_stats()})
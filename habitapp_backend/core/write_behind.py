@@ -0,0 +1,167 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+PENDING_KEY = 'perfil:pending:{}:{}'
+
+# Counters that move by deltas; racha_maxima is derived from racha_actual when flushing
+DELTA_FIELDS = ('puntos_totales', 'habitos_completados', 'num_habitos_creados', 'racha_actual')
+
+# Users per UPDATE, keeps the CASE lists and bind parameters bounded
+FLUSH_BATCH = 500
+
+if settings.PROFILE_WRITE_BEHIND and not settings.CACHE_SHARED:
+    print("WARNING: PROFILE_WRITE_BEHIND without REDIS_URL. Pending profile deltas are only visible to the worker that queued them.")
+
+
+class ProfileWriteBehind:
+    """
+    Optional write-behind for the Perfil counters (PROFILE_WRITE_BEHIND).
+
+    Each process coalesces the deltas of its own requests in memory and flushes
+    them every PROFILE_FLUSH_INTERVAL_MS with one UPDATE per batch of users, so
+    a user toggling habits many times a minute costs one row write per interval.
+    The same deltas are mirrored into cache counters, which is what reads
+    merge. Only with a shared cache (REDIS_URL) does every worker serving
+    /user/me/ see writes not flushed yet; with the per-process default a worker
+    sees its own pending deltas only, and other workers show the counters as
+    of the last flush (at most PROFILE_FLUSH_INTERVAL_MS behind). Flushing
+    from the process ledger rather than from the cache keeps it exactly-once,
+    since the cache API has no atomic read-and-reset.
+
+    Deltas of a process killed before its flush are lost; `reconcile_profiles
+    --fix` recomputes the counters from habitos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+        self.stats = {'deltas': 0, 'flushes': 0, 'rows': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return settings.PROFILE_WRITE_BEHIND
+
+    def add(self, id_usuario, deltas):
+        deltas = {f: d for f, d in deltas.items() if d}
+        if not deltas:
+            return
+        with self._lock:
+            ledger = self._pending.setdefault(id_usuario, {})
+            for field, delta in deltas.items():
+                ledger[field] = ledger.get(field, 0) + delta
+            self.stats['deltas'] += 1
+        for field, delta in deltas.items():
+            key = PENDING_KEY.format(id_usuario, field)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                # Evicted between add and incr
+                cache.set(key, delta, None)
+        self._ensure_flusher()
+
+    def pending(self, ids):
+        """{id_usuario: {field: delta}} not yet flushed by any process."""
+        keys = {PENDING_KEY.format(i, f): (i, f) for i in ids for f in DELTA_FIELDS}
+        result = {}
+        for key, value in cache.get_many(list(keys)).items():
+            if value:
+                id_usuario, field = keys[key]
+                result.setdefault(id_usuario, {})[field] = value
+        return result
+
+    def apply_pending(self, perfiles):
+        """Adds the pending deltas to Perfil instances in place (for reads)."""
+        pending = self.pending([p.usuario_id for p in perfiles])
+        for perfil in perfiles:
+            for field, delta in pending.get(perfil.usuario_id, {}).items():
+                setattr(perfil, field, getattr(perfil, field) + delta)
+            perfil.racha_maxima = max(perfil.racha_maxima, perfil.racha_actual)
+        return perfiles
+
+    def flush(self):
+        """Writes this process's coalesced deltas. Returns the number of profiles updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            ids = list(pending)
+            with transaction.atomic():
+                for start in range(0, len(ids), FLUSH_BATCH):
+                    self._write({i: pending[i] for i in ids[start:start + FLUSH_BATCH]})
+        except Exception as e:
+            # Keep the deltas for the next attempt, merged with any that arrived meanwhile
+            with self._lock:
+                for id_usuario, deltas in pending.items():
+                    ledger = self._pending.setdefault(id_usuario, {})
+                    for field, delta in deltas.items():
+                        ledger[field] = ledger.get(field, 0) + delta
+                self.stats['errors'] += 1
+            print(f"WARNING: profile write-behind flush failed: {e}")
+            return 0
+
+        # Only now stop showing them as pending; increments made meanwhile stay
+        for id_usuario, deltas in pending.items():
+            for field, delta in deltas.items():
+                try:
+                    cache.decr(PENDING_KEY.format(id_usuario, field), delta)
+                except ValueError:
+                    pass
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['rows'] += len(pending)
+        return len(pending)
+
+    def _write(self, pending):
+        fields = [f for f in DELTA_FIELDS if any(d.get(f) for d in pending.values())]
+        ids = list(pending)
+        assignments, params = [], []
+
+        def case(field):
+            rows = [(i, pending[i][field]) for i in ids if pending[i].get(field)]
+            params.extend(v for row in rows for v in row)
+            return 'CASE id_usuario {} ELSE 0 END'.format(' '.join(['WHEN %s THEN %s'] * len(rows)))
+
+        for field in fields:
+            assignments.append('{0} = {0} + {1}'.format(field, case(field)))
+        if 'racha_actual' in fields:
+            # Every SET expression sees the old row, so the new streak is recomputed here
+            assignments.append(
+                'racha_maxima = CASE WHEN racha_actual + {} > racha_maxima '
+                'THEN racha_actual + {} ELSE racha_maxima END'.format(case('racha_actual'), case('racha_actual'))
+            )
+        params.extend(ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE perfiles SET {} WHERE id_usuario IN ({})'.format(
+                    ', '.join(assignments), ', '.join(['%s'] * len(ids))
+                ),
+                params,
+            )
+
+    def _ensure_flusher(self):
+        # Started lazily so every forked server worker runs its own
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='perfil-write-behind', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.PROFILE_FLUSH_INTERVAL_MS / 1000)
+            # Same connection housekeeping as a request would get
+            close_old_connections()
+            self.flush()
+
+
+profile_write_behind = ProfileWriteBehind()
@@ -5,3 +5,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
 
 application = get_asgi_application()
+
+# Open the database pool once per worker process, before it takes traffic
+if os.environ.get('DATABASE_POOL_PREWARM', 'True') == 'True':
+    from django.conf import settings
+    from core.db_pool import warm_pool
+    for alias in settings.DATABASES:
+        warm_pool(alias)
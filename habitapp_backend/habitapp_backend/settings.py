@@ -31,6 +31,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # CORS first
+    'core.metrics.MetricsMiddleware', # Prometheus latency and in-flight requests
+    'core.query_metrics.QueryMetricsMiddleware', # Times everything below it
+    'core.profiling.ProfilingMiddleware', # Sampled or on-demand request profiles
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'habitapp_backend.urls'
@@ -63,14 +67,83 @@ WSGI_APPLICATION = 'habitapp_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': dj_database_url.config(
-        default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600,
-        ssl_require=True
+# Disable for local stand-ins (SQLite or a local Postgres without TLS)
+DATABASE_SSL_REQUIRE = os.environ.get('DATABASE_SSL_REQUIRE', 'True') == 'True'
+
+# Client-side connection pool (psycopg 3). Connections are checked before reuse
+# (CONN_HEALTH_CHECKS), rotated after max_lifetime seconds and pre-warmed in wsgi.py.
+# Set DATABASE_POOL=False to fall back to persistent per-worker connections.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'True') == 'True'
+DATABASE_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+    'max_lifetime': int(os.environ.get('DATABASE_POOL_MAX_LIFETIME', 1800)),
+    'max_idle': 300,
+    'timeout': 10,  # Seconds a request waits for a free connection
+}
+
+
+def database_config(url):
+    if not url:
+        return {}
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DATABASE_POOL else 600,
+        conn_health_checks=True,
+        ssl_require=DATABASE_SSL_REQUIRE
     )
+    if DATABASE_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        config.setdefault('OPTIONS', {})['pool'] = dict(DATABASE_POOL_OPTIONS)
+    return config
+
+
+DATABASES = {
+    'default': database_config(os.environ.get('DATABASE_URL'))
 }
 
+# Read replicas (comma separated URLs), exposed as replica1, replica2, ...
+# Only views using core.db_router.ReplicaReadMixin or read_from_replica() read from them.
+DATABASE_REPLICAS = []
+for i, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES['replica{}'.format(i)] = database_config(url.strip())
+    DATABASE_REPLICAS.append('replica{}'.format(i))
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Seconds a user's reads stay on the primary after one of their writes
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# Replicas lagging more than this (seconds) are skipped
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 10))
+REPLICA_CHECK_INTERVAL = 15
+
+# Cache
+# Local memory by default (per worker); set REDIS_URL to share it across workers
+CACHE_SHARED = bool(os.environ.get('REDIS_URL'))
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Writes invalidate these entries (or bump their generation) in the cache they
+# can see. With the per-worker default that is only the worker serving the
+# write, so without REDIS_URL the TTLs default to a few seconds: the longest
+# another worker can serve a user their own stale data.
+CACHE_DEFAULT_TTL = 3600 if CACHE_SHARED else 5
+# Seconds a Usuario row stays cached for request.user.usuario
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60 if CACHE_SHARED else 5))
+# Seconds a serialized habit list stays cached (entries are versioned per user)
+HABITOS_CACHE_TTL = int(os.environ.get('HABITOS_CACHE_TTL', CACHE_DEFAULT_TTL))
+# Seconds a /api/stats/summary/ payload stays cached (versioned like the habit list)
+STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', CACHE_DEFAULT_TTL))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,6 +160,98 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Seconds between reloads of the achievement thresholds (core/achievements.py)
+ACHIEVEMENTS_RELOAD = 60
+
+# Recommendations kept per user by `build_recommendations` (core/recommender.py)
+RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', 5))
+
+# Habit name autocomplete (core/autocomplete.py)
+# Largest ?limit= accepted, also the suggestions kept per trie node
+AUTOCOMPLETE_MAX_LIMIT = 10
+# Seconds between reloads of the in-process trie (non-Postgres databases)
+AUTOCOMPLETE_RELOAD = 300
+
+# Streaming list responses and the data export (core/streaming.py)
+# Rows fetched per server-side cursor round trip and encoded per chunk
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 2000))
+# On-the-fly compression; brotli is used when the module is installed and accepted
+STREAM_GZIP_LEVEL = 6
+STREAM_BROTLI_QUALITY = 4
+
+# Habit history import (core/importer.py)
+# Rows validated and loaded per batch
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+# Invalid rows listed in the response; the rest are only counted
+IMPORT_MAX_ERRORS = 20
+
+# Write-behind for the Perfil counters (core/write_behind.py)
+# When True, habit toggles queue point/completion/streak deltas instead of updating perfiles
+# Reads merge the pending deltas across workers only with a shared cache (REDIS_URL)
+PROFILE_WRITE_BEHIND = os.environ.get('PROFILE_WRITE_BEHIND', 'False') == 'True'
+# Milliseconds between flushes of the queued deltas, per server worker
+PROFILE_FLUSH_INTERVAL_MS = int(os.environ.get('PROFILE_FLUSH_INTERVAL_MS', 500))
+
+# Password hashing pool (core/hashing.py)
+# 0 hashes inline in the request worker
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+# Jobs queued or running per server worker before logins get a 503
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 32))
+PASSWORD_HASHING_TIMEOUT = 10
+
+# SQL instrumentation (core/query_metrics.py)
+QUERY_METRICS = os.environ.get('QUERY_METRICS', 'True') == 'True'
+# Budgets per request; a view may set `query_budget` instead of QUERY_COUNT_LIMIT
+QUERY_COUNT_LIMIT = int(os.environ.get('QUERY_COUNT_LIMIT', 20))
+# Same statement more often than this in one request is reported as N+1
+QUERY_SIMILAR_LIMIT = int(os.environ.get('QUERY_SIMILAR_LIMIT', 5))
+QUERY_TIME_LIMIT_MS = float(os.environ.get('QUERY_TIME_LIMIT_MS', 500))
+# True raises QueryBudgetExceeded instead of logging a warning (use in tests)
+QUERY_LIMITS_STRICT = os.environ.get('QUERY_LIMITS_STRICT', 'False') == 'True'
+# Print the per-route report when the process exits
+QUERY_METRICS_REPORT_AT_EXIT = os.environ.get('QUERY_METRICS_REPORT_AT_EXIT', 'False') == 'True'
+
+# Prometheus metrics at /metrics (core/metrics.py)
+# When set, scrapers must send "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Seconds between refreshes of the per-worker database pool gauges
+METRICS_POOL_INTERVAL = 5
+
+# Request profiling (core/profiling.py)
+# Fraction of requests profiled at random (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# Requests with "X-Profile: <token>" are always profiled; empty disables the header
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+# 'sampling' (collapsed stacks) or 'cprofile' (pstats)
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        # One JSON line per request at INFO, budget violations at WARNING
+        'core.queries': {
+            'handlers': ['console'],
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        # Progress of habit imports, one line per batch (core/importer.py)
+        'core.import': {
+            'handlers': ['console'],
+            'level': os.environ.get('IMPORT_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -110,8 +275,18 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'core.authentication.CachedJWTAuthentication',
+    ),
+    # orjson-backed JSON (core/renderers.py); the browsable API and form parsers are unchanged
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 from datetime import timedelta
@@ -121,3 +296,10 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
+
+# Token revocation (core/revocation.py)
+# Seconds between reloads of the in-process Bloom filter of revoked tokens (read-only;
+# expired rows are deleted by `manage.py prune_revoked_tokens`)
+REVOKED_TOKENS_REFRESH = int(os.environ.get('REVOKED_TOKENS_REFRESH', 30))
+# Minimum Bloom filter capacity (entries) before the false positive rate degrades
+REVOKED_TOKENS_BLOOM_CAPACITY = 10000
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from core.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
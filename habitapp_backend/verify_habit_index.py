@@ -0,0 +1,79 @@
+"""
+Checks that the habit list and streak lookups are planned as a range scan on
+habitos_usr_fecha_estado_idx instead of a join through usuario_habito, and the
+"due today" lookup on habitos_usr_dias_mask_idx. The plain habit list has no
+ORDER BY and only filters on the owner, so either owner index serves it.
+
+Run against a local stand-in, never against Neon:
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python manage.py setup_local_db
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python verify_habit_index.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import F
+from core.dias import day_bit
+from core.models import Usuario, Habito, UsuarioHabito
+
+INDEX_NAME = 'habitos_usr_fecha_estado_idx'
+DIAS_INDEX_NAME = 'habitos_usr_dias_mask_idx'
+
+
+def seed():
+    user, _ = Usuario.objects.get_or_create(
+        username='index_check', defaults={'email': 'index_check@example.com', 'password': 'x'}
+    )
+    if not Habito.objects.filter(usuario=user).exists():
+        for i in range(50):
+            habito = Habito.objects.create(
+                nombre='Habit {}'.format(i), usuario=user,
+                fecha=date.today() - timedelta(days=i % 10),
+                estado='completado' if i % 2 else 'pendiente',
+            )
+            UsuarioHabito.objects.create(usuario=user, habito=habito)
+    return user
+
+
+def verify():
+    user = seed()
+    if connection.vendor == 'postgresql':
+        # Tiny local tables would otherwise always get a sequential scan
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    today = date.today()
+    # label: (queryset, indexes any of which is acceptable)
+    queries = {
+        'habit list': (Habito.objects.filter(usuario=user), (INDEX_NAME, DIAS_INDEX_NAME)),
+        'streak (today)': (Habito.objects.filter(usuario=user, estado='completado', fecha=today), (INDEX_NAME,)),
+        'streak (yesterday)': (Habito.objects.filter(
+            usuario=user, estado='completado', fecha=today - timedelta(days=1)
+        ).values('id_habito')[:1], (INDEX_NAME,)),
+        'due today': (Habito.objects.filter(usuario=user).alias(
+            vence=F('dias_mask').bitand(day_bit(today))
+        ).exclude(vence=0), (DIAS_INDEX_NAME,)),
+    }
+
+    ok = True
+    for label, (queryset, indexes) in queries.items():
+        plan = queryset.explain()
+        used = [name for name in indexes if name in plan]
+        print('--- {} ---'.format(label))
+        print(plan)
+        if used and 'usuario_habito' not in plan:
+            print('PASS: planned on {}'.format(used[0]))
+        else:
+            print('FAIL: plan does not use {}'.format(' or '.join(indexes)))
+            ok = False
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if verify() else 1)
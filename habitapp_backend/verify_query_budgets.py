@@ -0,0 +1,244 @@
+"""
+Query budget check for every route in core/urls.py.
+
+Seeds a local database at two sizes and requests each route once per size with
+the caches cleared (the cold path). Every request must stay within its fixed
+budget in CASES, and none may run more queries at the large size than at the
+small one: a count that grows with the data is an N+1. A route added to
+core/urls.py without an entry in CASES fails the check too. The chat model call
+is stubbed (CHAT_REPLY), so the check runs offline and only counts queries.
+
+Run against a local stand-in, never against Neon:
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python manage.py setup_local_db
+    DATABASE_URL=sqlite:///local.db DATABASE_SSL_REQUIRE=False python verify_query_budgets.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+from unittest import mock
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.urls import URLPattern, URLResolver
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core import urls as core_urls
+from core.chat_service import ChatService
+from core.dias import dias_to_mask
+from core.hashing import make_password
+from core.models import Habito, Logro, Perfil, Preferencia, Usuario, UsuarioHabito, UsuarioLog, UsuarioLogro
+from core.query_metrics import budget_violations, record_queries
+
+PASSWORD = 'BudgetPassword123'
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+PREFIX = 'qbudget_'
+SIZES = {'small': (5, 3), 'large': (60, 60)}  # (other users, habits per user)
+DIAS = 'Lun,Mie,Vie'
+CHAT_REPLY = 'Respuesta de prueba'
+IMPORT_BODY = b''.join(
+    b'{"nombre": "Importado %d", "puntos": 5, "estado": "completado", "dias": "Lun,Mie,Vie"}\n' % i for i in range(3)
+)
+
+
+def create_users(names, password):
+    Usuario.objects.bulk_create([
+        Usuario(username=name, email='{}@budget.local'.format(name), password=password) for name in names
+    ])
+    users = list(Usuario.objects.filter(username__in=names).order_by('id_usuario'))
+    Perfil.objects.bulk_create([Perfil(usuario=u, puntos_totales=10 * i) for i, u in enumerate(users)])
+    Preferencia.objects.bulk_create([Preferencia(usuario=u) for u in users])
+    return users
+
+
+def seed(label, other_users, habits_per_user):
+    """Returns the request context for one data size."""
+    encoded = make_password(PASSWORD)
+    today = date.today()
+    with transaction.atomic():
+        names = ['{}{}_{}'.format(PREFIX, label, role) for role in ('main', 'link', 'scratch', 'password', 'logout')]
+        names += ['{}{}_{}'.format(PREFIX, label, i) for i in range(other_users)]
+        users = create_users(names, encoded)
+        main, link, scratch = users[0], users[1], users[2]
+        habitos = [
+            Habito(
+                usuario=u, nombre='Hábito {}'.format(i), puntos=10, categoria='Salud', dias=DIAS,
+                dias_mask=dias_to_mask(DIAS), fecha=today - timedelta(days=i % 14),
+                estado='completado' if i % 2 else 'pendiente',
+            )
+            for u in users if u is not link for i in range(habits_per_user)
+        ]
+        Habito.objects.bulk_create(habitos, batch_size=1000)
+        # The link tables have a fake primary key, so their detail routes need exactly one row
+        link_habito = Habito.objects.create(usuario=link, nombre='Enlace', puntos=10, dias=DIAS)
+        UsuarioHabito.objects.create(usuario=link, habito=link_habito)
+        logros = list(Logro.objects.all()[:1]) or [Logro.objects.create(nombre='Presupuesto', puntos=10)]
+        UsuarioLogro.objects.create(usuario=link, logro=logros[0])
+        # bulk_create skips the audit signal; the log routes only list the caller's rows
+        UsuarioLog.objects.create(id_usuario=main.id_usuario, accion='INSERT', datos_nuevos={'username': main.username})
+
+    habito_ids = list(Habito.objects.filter(usuario=main).values_list('id_habito', flat=True))
+    return {
+        'label': label,
+        'main': main,
+        'link': link,
+        'scratch': scratch,
+        'token': str(RefreshToken.for_user(main).access_token),
+        'scratch_token': str(RefreshToken.for_user(scratch).access_token),
+        'password_user': users[3],
+        'password_token': str(RefreshToken.for_user(users[3]).access_token),
+        'logout_token': str(RefreshToken.for_user(users[4]).access_token),
+        'logout_refresh': str(RefreshToken.for_user(users[4])),
+        'habito': habito_ids[0],
+        'scratch_habito': habito_ids[-1],
+        'logro': logros[0].pk,
+    }
+
+
+# route name -> [(method, path, body, token key, budget)]; path and body may be callables of ctx
+CASES = {
+    'api-root': [('GET', '/api/', None, 'token', 0)],
+    'usuario-list': [('GET', '/api/usuarios/', None, 'token', 1)],
+    'usuario-detail': [('GET', lambda c: '/api/usuarios/{}/'.format(c['main'].pk), None, 'token', 1)],
+    'perfil-list': [('GET', '/api/perfiles/', None, 'token', 1)],
+    'perfil-detail': [('GET', lambda c: '/api/perfiles/{}/'.format(c['main'].pk), None, 'token', 1)],
+    'preferencia-list': [('GET', '/api/preferencias/', None, 'token', 1)],
+    'preferencia-detail': [('GET', lambda c: '/api/preferencias/{}/'.format(c['main'].pk), None, 'token', 1)],
+    'habito-list': [
+        ('GET', '/api/habitos/', None, 'token', 1),
+        ('GET', '/api/habitos/?fields=id_habito,estado,puntos', None, 'token', 1),
+        ('POST', '/api/habitos/', {'nombre': 'Nuevo', 'puntos': 10, 'fecha': date.today().isoformat(), 'dias': DIAS}, 'token', 5),
+    ],
+    'habito-detail': [
+        ('GET', lambda c: '/api/habitos/{}/'.format(c['habito']), None, 'token', 1),
+        ('PATCH', lambda c: '/api/habitos/{}/'.format(c['habito']), {'estado': 'completado'}, 'token', 7),
+        ('DELETE', lambda c: '/api/habitos/{}/'.format(c['scratch_habito']), None, 'token', 4),
+    ],
+    'habito-today': [('GET', '/api/habitos/today/', None, 'token', 2)],
+    'habito-autocomplete': [('GET', '/api/habitos/autocomplete/?q=hab', None, 'token', 1)],
+    # Raw NDJSON body: (content type, bytes)
+    'habito-import': [('POST', '/api/habitos/import/', ('application/x-ndjson', IMPORT_BODY), 'token', 14)],
+    'usuariohabito-list': [('GET', '/api/usuario_habitos/', None, 'token', 1)],
+    'usuariohabito-detail': [('GET', lambda c: '/api/usuario_habitos/{}/'.format(c['link'].pk), None, 'token', 1)],
+    'logro-list': [('GET', '/api/logros/', None, 'token', 1)],
+    'logro-detail': [('GET', lambda c: '/api/logros/{}/'.format(c['logro']), None, 'token', 1)],
+    'usuariologro-list': [('GET', '/api/usuario_logros/', None, 'token', 1)],
+    'usuariologro-detail': [('GET', lambda c: '/api/usuario_logros/{}/'.format(c['link'].pk), None, 'token', 1)],
+    'usuariolog-list': [('GET', '/api/logs/', None, 'token', 1)],
+    'usuariolog-detail': [('GET', lambda c: '/api/logs/{}/'.format(latest_log(c)), None, 'token', 1)],
+    'register': [('POST', '/api/auth/register/', lambda c: {
+        'username': '{}{}_registered'.format(PREFIX, c['label']),
+        'email': '{}{}_registered@budget.local'.format(PREFIX, c['label']), 'password': PASSWORD,
+    }, None, 4)],
+    'login': [('POST', '/api/auth/login/', lambda c: {'username': c['main'].username, 'password': PASSWORD}, None, 1)],
+    'logout': [('POST', '/api/auth/logout/', lambda c: {'refresh': c['logout_refresh']}, 'logout_token', 10)],
+    'change-password': [('POST', '/api/auth/change-password/', {
+        'old_password': PASSWORD, 'new_password': PASSWORD + '!',
+    }, 'password_token', 8)],
+    'user-profile': [
+        ('GET', '/api/user/me/', None, 'token', 3),
+        ('PATCH', '/api/user/me/', {'perfil': {'biografia': 'Hola'}, 'preferencias': {'modo_oscuro': True}}, 'token', 7),
+        ('DELETE', '/api/user/me/', None, 'scratch_token', 17),
+    ],
+    'ranking': [
+        ('GET', '/api/ranking/', None, 'token', 1),
+        ('GET', '/api/ranking/?fields=id_usuario,puntos_totales&compact=true', None, 'token', 1),
+    ],
+    'stats-summary': [('GET', '/api/stats/summary/', None, 'token', 6)],
+    'recommendations': [('GET', '/api/recommendations/', None, 'token', 3)],
+    # Rows are read while the response streams; this counts the view itself
+    'export': [('GET', '/api/export/', None, 'token', 1)],
+    'prolog-demo': [('GET', '/api/prolog-demo/?action=nivel_usuario&puntos=120', None, None, 0)],
+    'chat': [('POST', '/api/chat/', {'message': 'Hola'}, 'token', 0)],
+    'health': [('GET', '/api/health/', None, None, 1)],
+}
+
+
+def latest_log(ctx):
+    return UsuarioLog.objects.filter(id_usuario=ctx['main'].id_usuario).order_by('-id_log').values_list('id_log', flat=True).first()
+
+
+def route_names(patterns, names=None):
+    names = set() if names is None else names
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            route_names(pattern.url_patterns, names)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def measure(ctx):
+    client = APIClient()
+    requests = []
+    for name, cases in CASES.items():
+        for method, path, body, token_key, budget in cases:
+            # Query string variants of the same route get their own line
+            label = '{} ?{}'.format(name, path.split('?', 1)[1]) if isinstance(path, str) and '?' in path else name
+            headers = {'HTTP_AUTHORIZATION': 'Bearer ' + ctx[token_key]} if token_key else {}
+            requests.append((label, method, path, body, headers, budget))
+
+    # Warm the in-process state (revocation filter, autocomplete trie) so that
+    # periodic reloads are not charged to whichever request happens to hit them
+    for name, method, path, body, headers, budget in requests:
+        if method == 'GET':
+            client.get(path(ctx) if callable(path) else path, **headers)
+
+    counts = {}
+    for name, method, path, body, headers, budget in requests:
+        path = path(ctx) if callable(path) else path
+        body = body(ctx) if callable(body) else body
+        cache.clear()
+        with record_queries() as recorder:
+            if isinstance(body, tuple):
+                content_type, data = body
+                response = client.generic(method, path, data, content_type=content_type, **headers)
+            else:
+                response = getattr(client, method.lower())(path, body, format='json', **headers)
+        counts['{} {}'.format(method, name)] = (recorder.summary(), response.status_code, budget)
+    return counts
+
+
+def verify():
+    if connection.vendor != 'sqlite' and connection.settings_dict.get('HOST') not in LOCAL_HOSTS:
+        raise SystemExit('Refusing to seed non-local database host {}'.format(connection.settings_dict.get('HOST')))
+
+    missing = route_names(core_urls.urlpatterns) - set(CASES)
+    if missing:
+        print('Routes without a query budget case: {}'.format(', '.join(sorted(missing))))
+        return False
+
+    Usuario.objects.filter(username__startswith=PREFIX).delete()
+    results = {}
+    with mock.patch.object(ChatService, 'get_chat_response', return_value=CHAT_REPLY):
+        for label, (other_users, habits_per_user) in SIZES.items():
+            results[label] = measure(seed(label, other_users, habits_per_user))
+
+    ok = True
+    print('{:<60} {:>6} {:>6} {:>7} {:>7}'.format('request', 'small', 'large', 'budget', 'status'))
+    for key, (small, small_status, budget) in results['small'].items():
+        large, large_status, _ = results['large'][key]
+        problems = budget_violations(small, max_queries=budget) + budget_violations(large, max_queries=budget)
+        if large['queries'] > small['queries']:
+            problems.append('grows with data: {} -> {} queries ({})'.format(
+                small['queries'], large['queries'], large['similar_sql']
+            ))
+        if small_status >= 500 or large_status >= 500:
+            problems.append('server error')
+        print('{:<60} {:>6} {:>6} {:>7} {:>7}'.format(key, small['queries'], large['queries'], budget, large_status))
+        for problem in problems:
+            print('    FAIL: {}'.format(problem))
+        ok = ok and not problems
+
+    Usuario.objects.filter(username__startswith=PREFIX).delete()
+    return ok
+
+
+if __name__ == '__main__':
+    ok = verify()
+    print('OK' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
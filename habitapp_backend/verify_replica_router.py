@@ -0,0 +1,80 @@
+"""
+Checks the read-replica router with two local databases: reads from designated
+views go to the replica, a user's own write makes them sticky to the primary,
+and an unhealthy replica falls back to the primary.
+
+With SQLite stand-ins (or two local Postgres instances):
+    export DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica.db DATABASE_SSL_REQUIRE=False
+    python manage.py setup_local_db
+    python manage.py setup_local_db --database replica1
+    python verify_replica_router.py
+
+There is no replication between the stand-ins, so the script writes the "replicated"
+rows itself and leaves the replica stale on purpose.
+"""
+import os
+import sys
+import uuid
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habitapp_backend.settings')
+django.setup()
+
+from django.conf import settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.db_router import replica_health
+from core.models import Usuario, Perfil, Preferencia
+
+
+def ranking_points(client, id_usuario):
+    response = client.get('/api/ranking/')
+    for row in response.data:
+        if row['id_usuario'] == id_usuario:
+            return row['puntos_totales']
+    return None
+
+
+def check(label, condition):
+    print('{}: {}'.format('PASS' if condition else 'FAIL', label))
+    return condition
+
+
+def verify():
+    if not settings.DATABASE_REPLICAS:
+        print('FAIL: set DATABASE_REPLICA_URLS to at least one replica')
+        return False
+    replica = settings.DATABASE_REPLICAS[0]
+
+    name = 'replica_check_{}'.format(uuid.uuid4().hex[:8])
+    user = Usuario.objects.create(username=name, email='{}@example.com'.format(name), password='x')
+    Perfil.objects.create(usuario=user, puntos_totales=10)
+    Preferencia.objects.create(usuario=user)
+    # "Replicate" the rows, then let the primary move ahead
+    Usuario.objects.using(replica).create(
+        id_usuario=user.id_usuario, username=name, email=user.email, password='x'
+    )
+    Perfil.objects.using(replica).create(usuario_id=user.id_usuario, puntos_totales=10)
+    Perfil.objects.filter(usuario=user).update(puntos_totales=99)
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(RefreshToken.for_user(user).access_token))
+
+    ok = check('ranking reads from the replica', ranking_points(client, user.id_usuario) == 10)
+
+    client.patch('/api/user/me/', {'perfil': {'biografia': 'hola'}}, format='json')
+    ok &= check('reads stick to the primary after the user writes', ranking_points(client, user.id_usuario) == 99)
+
+    # Treat every replica as lagging and force a new probe
+    settings.REPLICA_STICKY_SECONDS = 0
+    settings.REPLICA_MAX_LAG = -1
+    replica_health._checked_at = None
+    other = Usuario.objects.create(username=name + 'b', email='{}b@example.com'.format(name), password='x')
+    client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(RefreshToken.for_user(other).access_token))
+    ok &= check('lagging replica falls back to the primary', ranking_points(client, user.id_usuario) == 99)
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if verify() else 1)
@@ -246,6 +246,10 @@ export default function App() {
   };
 
   const handleLogout = () => {
+    if (sessionStorage.getItem('accessToken')) {
+      // Revoke the tokens server-side; the local session is cleared regardless
+      api.auth.logout().catch(() => {});
+    }
     sessionStorage.removeItem('accessToken');
     sessionStorage.removeItem('refreshToken');
     sessionStorage.removeItem('user');
@@ -42,6 +42,7 @@ export interface Habit {
     fecha: string;
     categoria: string;
     dias: string;
+    dias_mask?: number;
     estado: 'pendiente' | 'completado';
 }
 
@@ -96,7 +97,22 @@ export const api = {
                 const error = await response.json();
                 throw error;
             }
-            return response.json();
+            const data = await response.json();
+            // Changing the password revokes every previous token; keep the new ones
+            if (data.access) {
+                sessionStorage.setItem('accessToken', data.access);
+                sessionStorage.setItem('refreshToken', data.refresh);
+            }
+            return data;
+        },
+
+        async logout(): Promise<void> {
+            const response = await fetch(`${API_URL}/auth/logout/`, {
+                method: 'POST',
+                headers: getHeaders(),
+                body: JSON.stringify({ refresh: sessionStorage.getItem('refreshToken') || undefined }),
+            });
+            if (!response.ok) throw new Error('Failed to logout');
         }
     },
 
@@ -137,6 +153,14 @@ export const api = {
             });
             if (!response.ok) throw new Error('Failed to update preferences');
             return response.json();
+        },
+
+        async exportData(format: 'json' | 'ndjson' = 'json'): Promise<Blob> {
+            const response = await fetch(`${API_URL}/export/?stream=${format}`, {
+                headers: getHeaders(),
+            });
+            if (!response.ok) throw new Error('Failed to export data');
+            return response.blob();
         }
     },
 
@@ -149,6 +173,14 @@ export const api = {
             return response.json();
         },
 
+        async today(): Promise<Habit[]> {
+            const response = await fetch(`${API_URL}/habitos/today/`, {
+                headers: getHeaders(),
+            });
+            if (!response.ok) throw new Error('Failed to fetch today\'s habits');
+            return response.json();
+        },
+
         async create(habit: Partial<Habit>): Promise<Habit> {
             const response = await fetch(`${API_URL}/habitos/`, {
                 method: 'POST',
@@ -179,6 +211,30 @@ export const api = {
                 headers: getHeaders(),
             });
             if (!response.ok) throw new Error('Failed to delete habit');
+        },
+
+        async importHistory(file: File, skipInvalid = false): Promise<{ importados: number, invalidos: number, errores: { linea: number, error: string }[] }> {
+            const form = new FormData();
+            form.append('file', file);
+            // No Content-Type: the browser sets the multipart boundary
+            const response = await fetch(`${API_URL}/habitos/import/${skipInvalid ? '?skip_invalid=true' : ''}`, {
+                method: 'POST',
+                headers: { 'Authorization': getHeaders().Authorization },
+                body: form,
+            });
+            const data = await response.json();
+            if (!response.ok) throw data;
+            return data;
+        }
+    },
+
+    stats: {
+        async summary(): Promise<any> {
+            const response = await fetch(`${API_URL}/stats/summary/`, {
+                headers: getHeaders(),
+            });
+            if (!response.ok) throw new Error('Failed to fetch stats');
+            return response.json();
         }
     },
 